@@ -1,6 +1,8 @@
-import streamlit as st
-import pandas as pd
 import numpy as np
+import streamlit as st
+
+from utils.assets import picture
+from utils.datasets import select_dataset
 
 # ---------------------------------------------------------------- Page config
 st.set_page_config(
@@ -9,23 +11,16 @@ st.set_page_config(
 )
 
 
-@st.cache_data()
-def read_csv(link):
-    return pd.read_csv(link)
+def show_image(name, caption):
+    """ Resized WebP/PNG copies from utils.assets, built on first use, or
+    the full size original if they can not be built """
+    html = picture(name, caption)
+    if html is None:
+        st.image(f'images/{name}.png', caption=caption)
+    else:
+        st.markdown(html, unsafe_allow_html=True)
 
 
-# -------------------------------------------------------------- Read Database
-if 'database' not in st.session_state:
-    st.session_state['database'] = read_csv('data/22-23_fbref_stats.csv')
-    # df = read_csv('data/22-23_fbref_stats.csv')
-# ----------------------------- DATA ------------------------------------------
-# Percentiles
-df = st.session_state['database']
-pizza = df
-
-# fixtures.loc[:, 'Fecha'] = fixtures_date[0]
-pizza = pizza.reset_index(drop=True)
-
 # ------------------------------- LAYOUT --------------------------------------
 # ------------------------------- Sidebar
 # st.sidebar.write('Hello')
@@ -56,7 +51,7 @@ subt = 'Exploración Visual de Rendimiento y Patrones Tácticos'
 st.write(f'## {t}')
 st.write(f'##### {subt}')
 
-st.image('images/chelsea_passes.png', caption=f'{t} - {subt}')
+show_image('chelsea_passes', f'{t} - {subt}')
 
 # Pizza Charts
 t = 'Pizza Charts'
@@ -64,7 +59,7 @@ subt = 'Calificación Comparativa basada en Rendimiento'
 st.write(f'## {t}')
 st.write(f'##### {subt}')
 
-st.image('images/pizza.png', caption=f'{t} - {subt}')
+show_image('pizza', f'{t} - {subt}')
 
 # Scatter Plot
 t = 'Scatter Plot Interactivo'
@@ -73,13 +68,13 @@ subt = 'Exploración Comparativa de Datos para Identificar Estilos de ' \
 st.write(f'## {t}')
 st.write(f'##### {subt}')
 
-st.image('images/progression.png', caption=f'{t} - {subt}')
+show_image('progression', f'{t} - {subt}')
 
 st.divider()
 
 # ------------------------------------------------------------------- RANK LIST
 
-st.subheader('Ranking de Rendimiento - Premier League 22/23')
+st.subheader('Ranking de Rendimiento')
 
 s = "\n\nSe crea un ranking por metrica normalizado\n" \
     "a la cantidad de 90s jugados y filtrado por posición.\n" \
@@ -99,55 +94,43 @@ st.write(s)
 #     st.write(s)
 
 
-# CHOOSE VALUE TO RANK
-if 'exclude_values_p90' not in st.session_state:
-    st.session_state['exclude_values_p90'] = ['Percent_of_Challenge_Success',
-                                              'Sh/90',
-                                              'SoT/90'
-                                              ]
+# -------------------------------------------------------------- Read Database
+# CHOOSE LEAGUE AND SEASON
+# Shared by all sessions of this process, only the selected slice is loaded
+dataset = select_dataset()
+st.write(f'##### {dataset.title}')
 
-exclude_values_p90 = st.session_state['exclude_values_p90']
+df = dataset.frame
 
-rv_df = df.iloc[:, 12:]  # Exclude categorical columns
-ranked_vals = rv_df.select_dtypes(include=np.number).columns.tolist()
+# CHOOSE VALUE TO RANK
+ranked_vals = list(dataset.metrics)  # Exclude categorical columns
 
 s = 'Rank by'
 rank_val = st.selectbox(s, ranked_vals, index=13)
 
-# Eliminate columns with 0 on stat to be ranked
-pizza = pizza[pizza[rank_val] != 0]
-
-# Make stat p90 where applicable
-if rank_val in exclude_values_p90:
-    div = 1
-else:
-    div = df['90s']
-
-pizza.loc[:, rank_val] = df[rank_val] / div
-
 col1, col2, col3 = st.columns(3)
 with col1:
     # FILTER BY POSITION
     pos_val = st.multiselect('Choose position',
                              df['pos'].unique(),
                              default=['FW'])
-    pizza = pizza[pizza['pos'].isin(pos_val)]
 
 with col2:
     # FILTER BY 90s
+    nineties = sorted(df['90s'].unique())
     z1, z2 = st.select_slider(
         'Select 90s',
-        options=sorted(df['90s'].unique()),
-        value=(np.median(df['90s'].unique()), np.max(df['90s'].unique())))
-    pizza = pizza[(pizza['90s'] >= z1) & (pizza['90s'] <= z2)]
+        options=nineties,
+        value=(np.median(nineties), np.max(nineties)))
 
 # Display rank table
-cols_to_show = ['player', 'team', '90s', rank_val, 'Rank']
-
-pizza['Rank'] = round(pizza[rank_val].rank(pct=True) * 100, 1)
-pizza = pizza.reset_index(drop=True)
+# Stat made p90 where applicable and presorted by 90s per position, so the
+# filters are index slices and only the players in range get ranked
+higher_is_better = dataset.metrics[rank_val].higher_is_better
+ranking = dataset.ranking.rank(rank_val, pos_val, z1, z2,
+                               higher_is_better=higher_is_better)
 
-st.dataframe(pizza[cols_to_show].sort_values('Rank', ascending=False))
+st.dataframe(ranking)
 
 st.divider()
 
@@ -1,8 +1,10 @@
 import streamlit as st
-import numpy as np
-import pandas as pd
-from mplsoccer import PyPizza, add_image, FontManager
-import matplotlib.pyplot as plt
+
+from utils.datasets import select_dataset
+from utils.percentiles import MIN_90S, POSITION_NAMES, POSITIONS
+from utils.pizza import DEFAULT_STATS, pizza_figure, pizza_subtitle
+from utils.render_service import RenderError, get_render_service, \
+    show_stats
 
 
 # ------------------------ Page config ----------------------------------------
@@ -11,93 +13,46 @@ st.set_page_config(
     page_icon=':soccer:'
 )
 
-# Load fonts
-font_normal = FontManager('https://raw.githubusercontent.com/google/fonts/main/ofl/roboto/'
-                          'Roboto%5Bwdth,wght%5D.ttf')
-font_italic = FontManager('https://raw.githubusercontent.com/google/fonts/main/ofl/roboto/'
-                          'Roboto-Italic%5Bwdth,wght%5D.ttf')
-font_bold = FontManager('https://raw.githubusercontent.com/google/fonts/main/apache/robotoslab/'
-                        'RobotoSlab%5Bwght%5D.ttf')
-
-green = '#2ba02b'
-red = '#d70232'
-yellow = '#ff9300'
-blue = '#1a78cf'
+# Rendered charts kept per server process, shared by every session. Least
+# recently used ones are dropped.
+MAX_PIZZAS = 256
 
 
 # --------------------------------- FUNCTIONS ---------------------------------
-@st.cache_data()
-def read_csv(link):
-    return pd.read_csv(link)
-
-
-def map_stat_labels(labels_list):
-    map_labels = {'Tackles\nplus\nInterceptions': 'Tackles +\nInterceptions',
-                  'Percent\nof\nChallenge\nSuccess': 'Succ. Challenge %'}
-
-    for i, label in enumerate(labels_list):
-        if label in map_labels.keys():
-            labels_list[i] = map_labels[label]
-
-    return labels_list
-
-
-def rank_data(stat_list, input_df, exclude_vals):
-    vals = []
-    debug = pd.DataFrame(input_df[['player', 'team', '90s']])
-
-    for val in stat_list:
-        ranks_df = pd.DataFrame(input_df[['player', 'team', '90s']])
-        ranks_df.loc[:, val] = input_df[val]
-        debug.loc[:, val] = input_df[val]
-        # Eliminate columns with 0 on stat to be ranked
-        ranks_df = ranks_df[ranks_df[val] != 0]
-        # Filter out players with less than 450 mins
-        ranks_df = ranks_df[ranks_df['90s'] >= 5]
-
-        # Make stat p90 where applicable
-        if val in exclude_vals:
-            div = 1
-        else:
-            div = ranks_df['90s']
-
-        ranks_df.loc[:, val] = ranks_df[val] / div
-
-        # Calculate rank from available players
-        ranks_df.loc[:, val] = round(ranks_df[val].rank(pct=True) * 100, 2)
-        debug.loc[:, val] = ranks_df.loc[:, val]  # copy ranks to debug table
-        # Store rank for selected player
-        try:
-            vals.append(ranks_df[val][ranks_df['player'] == player].iloc[0])
-
-        except IndexError:
-            vals.append(0)
-
-    return vals, debug
+@st.cache_data(max_entries=MAX_PIZZAS, show_spinner=False)
+def render_pizza(_dataset, version, player_id, team, stat_groups, cohort,
+                 min_90s):
+    """ Pizza chart PNG, cached per dataset version, player, team, metric
+    selection, cohort and minutes threshold """
+    profile = _dataset.profile(player_id,
+                               [m for group in stat_groups for m in group],
+                               team=team,
+                               min_90s=min_90s,
+                               cohort=cohort)
+
+    subtitle = pizza_subtitle(_dataset.league, _dataset.season, cohort)
+
+    # Drawn in a render worker; errors are not cached
+    return get_render_service().render(pizza_figure,
+                                       stat_groups,
+                                       profile.percentiles,
+                                       f"{profile.player} - {team}",
+                                       subtitle)
 
 
 # -------------------------------- DATA ---------------------------------------
-if 'database' not in st.session_state:
-    st.session_state['database'] = read_csv('data/22-23_fbref_stats.csv')
-df = st.session_state['database']
+# Choose league and season. Only the selected slice is loaded
+dataset = select_dataset(st.sidebar)
+df = dataset.frame
 
-# CHOOSE VALUE TO RANK
-if 'exclude_values_p90' not in st.session_state:
-    st.session_state['exclude_values_p90'] = ['Percent_of_Challenge_Success',
-                                              'Sh/90',
-                                              'SoT/90'
-                                              ]
+ranked_vals = list(dataset.metrics)  # Exclude categorical columns
 
-exclude_values_p90 = st.session_state['exclude_values_p90']
-
-pizza_rank = pd.DataFrame(df)
-
-rv_df = df.iloc[:, 12:]  # Exclude categorical columns
-ranked_vals = rv_df.select_dtypes(include=np.number).columns.tolist()
+min_90s = st.sidebar.slider('Mínimo de 90s jugados',
+                            min_value=0, max_value=20, value=MIN_90S)
 
 # ------------------------- RANK PIZZA PLOT ------------------------------
 st.header('Pizza Charts: Análisis de Rendimiento')
-st.write('##### Premier League 22/23')
+st.write(f'##### {dataset.title}')
 
 st.divider()
 
@@ -116,28 +71,41 @@ s = '1. Elegir equipo\n' \
 st.write(s)
 
 
-col1, col2 = st.columns(2)
+col1, col2, col3 = st.columns(3)
 
 with col1:
     # Filter by team
-    teams = pizza_rank.team.unique()
+    teams = df.team.unique().tolist()
     team = st.selectbox(
         label='Elegir Equipo',
-        options=pizza_rank.team.unique(),
-        index=int(np.where(teams == 'Manchester City')[0][0]),
+        options=teams,
+        index=teams.index('Manchester City')
+        if 'Manchester City' in teams else 0,
     )
 
 
 with col2:
     # Filter by player
-    players_from_team = pizza_rank[pizza_rank['team'] == team].player
-    player = st.selectbox(
+    players_from_team = dataset.players.team_players(team)
+    player_id = st.selectbox(
         label='Elegir Jugador',
         options=players_from_team,
-        index=10,
+        format_func=dataset.players.names.get,
+        index=min(10, len(players_from_team) - 1),
         # index=18,
     )
-    # Player is filtered after calculating ranks
+    row = dataset.players.row(player_id, team)
+
+with col3:
+    # Compare against all players or one of the player's positions
+    player_positions = [p for p in str(df['pos'].iat[row]).split(',')
+                        if p in POSITIONS]
+    cohort = st.selectbox(
+        label='Comparar con',
+        options=player_positions + [None],
+        format_func=lambda c: 'Todos' if c is None else POSITION_NAMES[c],
+    )
+
 
 # Tabs for stats select
 tab_def, tab_poss, tab_pmk, tab_atk = st.tabs(["Defensa",
@@ -153,13 +121,7 @@ with tab_def:
         stats_def = st.multiselect(
             'Choose stats',
             ranked_vals,
-            default=[
-                'Tkl+Int',
-                'TklWinPoss',
-                'DrbTkl%',
-                'AerialWin%',
-                'Clr',
-            ]
+            default=list(DEFAULT_STATS[0]),
         )
 
 with tab_poss:
@@ -168,13 +130,7 @@ with tab_poss:
         stats_poss = st.multiselect(
             'Choose stats',
             ranked_vals,
-            default=[
-                'PassesAttempted',
-                'TotCmp%',
-                'LiveTouch',
-                'ProgCarries',
-                'Switches'
-            ]
+            default=list(DEFAULT_STATS[1]),
         )
 
 with tab_pmk:
@@ -183,13 +139,7 @@ with tab_pmk:
         stats_pmk = st.multiselect(
             'Choose stats',
             ranked_vals,
-            default=[
-                'CarriesToFinalThird',
-                'ProgPasses',
-                'SuccDrb',
-                'KeyPasses',
-                'SCA90',
-            ]
+            default=list(DEFAULT_STATS[2]),
         )
 
 with tab_atk:
@@ -198,194 +148,37 @@ with tab_atk:
         stats_atk = st.multiselect(
             'Choose stats',
             ranked_vals,
-            default=[
-                'npxG',
-                'Shots',
-                'SoT%',
-                'npG-xG',
-                'ProgPassesRec'
-            ]
+            default=list(DEFAULT_STATS[3]),
         )
 
-# Vals for pizza chart
-rank_vals_def, ranks_debug_def = rank_data(stats_def,
-                                           pizza_rank,
-                                           exclude_values_p90
-                                           )
-
-rank_vals_poss, ranks_debug_poss = rank_data(stats_poss,
-                                             pizza_rank,
-                                             exclude_values_p90
-                                             )
-
-rank_vals_pmk, ranks_debug_pmk = rank_data(stats_pmk,
-                                           pizza_rank,
-                                           exclude_values_p90,
-                                           )
-
-rank_vals_atk, ranks_debug_atk = rank_data(stats_atk,
-                                           pizza_rank,
-                                           exclude_values_p90
-                                           )
-
-# Format labels for pizza plot
-labels = [x.replace('_', '\n') for x in
-          stats_def
-          + stats_poss
-          + stats_pmk
-          + stats_atk]
-labels = map_stat_labels(labels)
-
 # ---------------------- Plotting the Pizza Chart -----------------------------
-n_def = len(rank_vals_def)
-n_poss = len(rank_vals_poss)
-n_pmk = len(rank_vals_pmk)
-n_atk = len(rank_vals_atk)
-# color for the slices and text
-# slice_colors = ["#1A78CF"] * 5 + ["#FF9300"] * 5 + ["#D70232"] * 5
-slice_colors = ["#1A78CF"] * n_def \
-               + ["#FF9300"] * n_poss \
-               + ['#2ba02b'] * n_pmk \
-               + ["#D70232"] * n_atk \
-
-
-
-# text_colors = ["#000000"] * 10 + ["#F2F2F2"] * 5
-text_colors = ["#000000"] * (n_def + n_poss + n_pmk) + ["#F2F2F2"] * n_atk
-
-concat_of_vals = rank_vals_def + rank_vals_poss + rank_vals_pmk + rank_vals_atk
-
-baker = PyPizza(
-    params=labels,
-    background_color="#222222",  # background color
-    straight_line_color="#000000",  # color for straight lines
-    straight_line_lw=1,
-    last_circle_lw=1,  # linewidth of last circle
-    other_circle_lw=0,  # linewidth for other circles
-    inner_circle_size=20  # size of inner circle
-
-)
-
-fig_pizza, ax = baker.make_pizza(
-    values=concat_of_vals,
-    figsize=(8, 8.5),  # adjust the figsize according to your need
-    color_blank_space="same",  # use the same color to fill blank space
-    slice_colors=slice_colors,  # color for individual slices
-    value_colors=text_colors,  # color for the value-text
-    value_bck_colors=slice_colors,  # color for the blank spaces
-    blank_alpha=0.4,  # alpha for blank-space colors
-    kwargs_slices=dict(
-        edgecolor="#000000", zorder=2, linewidth=1
-    ),  # values to be used when plotting slices
-    kwargs_params=dict(
-        color="#F2F2F2", fontsize=11,
-        va='center',
-        wrap=True
-    ),  # values to be used when adding parameter labels
-    kwargs_values=dict(
-        color="#F2F2F2", fontsize=11,
-        zorder=3,
-        bbox=dict(
-            edgecolor="#000000", facecolor="cornflowerblue",
-            boxstyle="round,pad=0.2", lw=1
-        )
-    )  # values to be used when adding parameter-values labels
-)
-
-# ----------------------------- TEXT ELEMENTS
-# Add credits
-CREDIT_1 = "Data: Opta via fbref"
-
-fig_pizza.text(
-    0.01, 0.02, f"{CREDIT_1}", size=9,
-    color="#F2F2F2",
-    ha="left"
-)
-
-CREDIT_3 = 'Daniel Granja C.'
-CREDIT_4 = '@DGCFutbol'
-
-fig_pizza.text(
-    0.99, 0.02, f"{CREDIT_3}\n{CREDIT_4}",
-    size=12,
-    color="#F2F2F2",
-    ha="right"
-)
-
-# Add margin
-fig_pizza.text(
-    1, 0, "o", alpha=0
-)
-
-# Add title
-fig_pizza.text(
-    0.515, 0.975, f"{player} - {team}", size=16,
-    ha="center", fontproperties=font_bold.prop, color="#F2F2F2"
-)
-
-# add subtitle
-league = 'Premier League'
-season = '22-23'
-fig_pizza.text(
-    0.515, 0.9475,
-    f"Percentile Rank vs {league} Midfielders | Season {season}",
-    size=13,
-    ha="center", fontproperties=font_bold.prop, color="#F2F2F2"
-)
-
-leg_h = 0.915
-y_diff = 0.003
-
-# add text
-fig_pizza.text(
-    0.2, leg_h, "Ataque"
-                 + "         "
-                 + "Creación de Juego"
-                 + "          "
-                 + "Posesión"
-                 + "          "
-                 + "Defensa",
-    size=14,
-    fontproperties=font_bold.prop, color="#F2F2F2"
-)
-
-# add rectangles
-fig_pizza.patches.extend([
-    plt.Rectangle(
-        (0.17, leg_h-y_diff), 0.025, 0.021, fill=True, color=red,
-        transform=fig_pizza.transFigure, figure=fig_pizza
-    ),
-    plt.Rectangle(
-        (0.305, leg_h-y_diff), 0.025, 0.021, fill=True, color=green,
-        transform=fig_pizza.transFigure, figure=fig_pizza
-    ),
-    plt.Rectangle(
-        (0.572, leg_h-y_diff), 0.025, 0.021, fill=True, color=yellow,
-        transform=fig_pizza.transFigure, figure=fig_pizza
-    ),
-    plt.Rectangle(
-        (0.734, leg_h-y_diff), 0.025, 0.021, fill=True, color=blue,
-        transform=fig_pizza.transFigure, figure=fig_pizza
-    ),
-])
-
-# Add Credits
-
-# Show plot
-st.pyplot(fig_pizza)
+# Percentiles of every player in every stat are computed once per dataset,
+# minimum of 90s played and position group; this is only a lookup
+stat_groups = (tuple(stats_def), tuple(stats_poss), tuple(stats_pmk),
+               tuple(stats_atk))
+try:
+    pizza = render_pizza(dataset, dataset.version, player_id, team,
+                         stat_groups, cohort, min_90s)
+except RenderError as e:
+    st.warning(f'No se pudo generar el gráfico ({e}).')
+else:
+    # Show plot
+    st.image(pizza, use_column_width=True)
+
+show_stats()
 
 st.divider()
 # ----------------------------- Ranks Datatable
 
 
 # Create datatable for checking ranks from all players
-ranks_debug = ranks_debug_def.merge(ranks_debug_poss, how='left')
-ranks_debug = ranks_debug.merge(ranks_debug_atk, how='left')
+ranks = dataset.percentiles(min_90s, cohort)
+debug_stats = list(dict.fromkeys(stats_def + stats_poss + stats_atk))
+ranks_debug = df[['player']].join(ranks[debug_stats], how='inner')
 
-st.dataframe(ranks_debug[['player'] + stats_def + stats_poss + stats_atk])
+st.dataframe(ranks_debug)
 
 st.divider()
 
 st.text('TO-DO\n'
-        '- Make ranks per position (Pizza)\n'
         '- Get Positions from TransferMarket\n')
@@ -1,9 +1,9 @@
-import pandas as pd
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
 import numpy as np
-import statsmodels.api as sm
+
+from utils.datasets import select_dataset
+from utils.regression import FITS, trend_line
+from utils.scatter import base_figure, tag_annotation, with_tags
 
 # ------------------------ Page config ----------------------------------------
 st.set_page_config(
@@ -12,22 +12,44 @@ st.set_page_config(
 )
 
 
+# Base figures kept per server process. Least recently used ones are
+# dropped.
+MAX_SCATTERS = 64
+
+
 # ---------------------------- FUNCTIONS --------------------------------------
-@st.cache_data()
-def read_csv(link):
-    return pd.read_csv(link)
+def scatter_rows(dataset, val_x, val_y, z1, z2):
+    """ Players in the 90s range, with val_x and val_y made p90 where
+    applicable """
+    rows = dataset.frame
+    rows = rows[(rows['90s'] >= z1) & (rows['90s'] <= z2)]
+    return rows.assign(**{val_x: dataset.per90[val_x],
+                          val_y: dataset.per90[val_y]})
+
+
+@st.cache_data(max_entries=MAX_SCATTERS, show_spinner=False)
+def fit_trend(_dataset, version, val_x, val_y, z1, z2, method):
+    """ Trend curve, cached per dataset version, metrics, 90s range and fit,
+    so highlighting teams or players does not refit """
+    rows = scatter_rows(_dataset, val_x, val_y, z1, z2)
+    return trend_line(rows[val_x], rows[val_y], method)
 
 
-def make_p90(dataframe, stat):
-    # Make stat p90 where applicable
-    if stat in st.session_state['exclude_values_p90']:
-        div = 1
-    else:
-        div = dataframe['90s']
+@st.cache_data(max_entries=MAX_SCATTERS, show_spinner=False)
+def base_scatter(_dataset, version, val_x, val_y, z1, z2, teams,
+                 player_colors, trend_type, zone_lines_type):
+    """ Figure spec without title and tags, cached per dataset version,
+    metrics, 90s range, highlighted teams and players, and trend line fit
+    or zone lines """
+    rows = scatter_rows(_dataset, val_x, val_y, z1, z2)
 
-    dataframe.loc[:, stat] = dataframe[stat] / div
+    trend = None
+    if trend_type is not None:
+        trend = fit_trend(_dataset, version, val_x, val_y, z1, z2, trend_type)
 
-    return dataframe
+    fig = base_figure(rows, val_x, val_y, list(teams), dict(player_colors),
+                      trend, zone_lines_type)
+    return fig.to_plotly_json()
 
 
 def draw_zones(figure, dfr, xv, yv, hv, vv):
@@ -89,56 +111,20 @@ def draw_zones(figure, dfr, xv, yv, hv, vv):
                      )
 
 
-# ---------------------------- MAPPINGS --------------------------------------
-team_colours = {
-    'Arsenal': ['#FFFFFF', '#EF0107'],  # 063672
-    'Aston Villa': ['#95BFE5', '#670E36'],
-    'Bournemouth': ['#DA291C', '#000000'],
-    'Brentford': ['#FFFFFF', '#e30613'],
-    'Brighton': ['#0057B8', '#FFCD00'],
-    'Burnley': ['#6C1D45', '#99D6EA'],
-    'Chelsea': ['#034694', '#034694'],
-    'Crystal Palace': ['#1B458F', '#A7A5A6'],
-    'Everton': ['#003399', '#FFFFFF'],
-    'Fulham': ['#000000', '#CC0000'],
-    'Leeds United': ['#FFCD00', '#1D428A'],
-    'Leicester City': ['#003090', '#FDBE11'],
-    'Liverpool': ['#ce1317', '#9a1310'],
-    'Manchester Utd': ['#000000', '#DA291C'],
-    'Manchester City': ['#6CABDD', '#6CABDD'],
-    'Newcastle Utd': ['#241F20', '#FFFFFF'],
-    'Norwhich City': ['#FFF200', '#00A650'],
-    'Nott\'ham Forest': ['#ff0000', '#ff0000'],
-    'Sheffield Utd': ['#EE2737', '#FFFFFF'],
-    'Southampton': ['#D71920', '#130C0E'],
-    'Tottenham': ['#132257', '#FFFFFF'],
-    'Watford': ['#FBEE23', '#ED2127'],
-    'West Ham': ['#7A263A', '#1BB1E7'],
-    'Wolves': ['#FDB913', '#231F20'],
-}
-
 # -------------------------------- DATA ---------------------------------------
-if 'database' not in st.session_state:
-    st.session_state['database'] = read_csv('data/22-23_fbref_stats.csv')
-df = st.session_state['database']
-
-# CHOOSE VALUE TO RANK
-if 'exclude_values_p90' not in st.session_state:
-    st.session_state['exclude_values_p90'] = ['Percent_of_Challenge_Success',
-                                              'Sh/90',
-                                              'SoT/90'
-                                              ]
-
-exclude_values_p90 = st.session_state['exclude_values_p90']
+# Choose league and season. Only the selected slice is loaded
+dataset = select_dataset(st.sidebar)
+df = dataset.frame
 
 # ------------------------------- LAYOUT --------------------------------------
 # ------------------------------ Sidebar
 
 # Filter by 90s played
+nineties = sorted(df['90s'].unique())
 z1, z2 = st.sidebar.select_slider(
     'Filter by 90s',
-    options=sorted(df['90s'].unique()),
-    value=(np.median(df['90s'].unique()), np.max(df['90s'].unique()))
+    options=nineties,
+    value=(nineties[len(nineties) // 2], nineties[-1])
 )
 
 df = df[(df['90s'] >= z1) & (df['90s'] <= z2)]
@@ -170,25 +156,29 @@ elif sc == 'Acciones Progresivas':
     idx = 'ProgPasses'
     idy = 'ProgCarries'
 
+ranked_vals = list(dataset.metrics)
+
 # Selectbox to choose y value
 val_y = st.sidebar.selectbox(
     label='Choose value for y axis',
-    options=df.columns.values[12:],
-    index=int(np.where(df.columns.values[12:] == idy)[0][0])
+    options=ranked_vals,
+    index=ranked_vals.index(idy)
 )
 
 # Selectbox to choose x value
 val_x = st.sidebar.selectbox(
     label='Choose value for x axis',
-    options=df.columns.values[12:],
-    index=int(np.where(df.columns.values[12:] == idx)[0][0])
+    options=ranked_vals,
+    index=ranked_vals.index(idx)
 )
 
 # Selectbox to highlight team
+team_options = df.team.unique().tolist()
 teams = st.sidebar.multiselect(
     label='Highlight team',
-    options=df.team.unique(),
-    default=['Manchester City', 'Manchester Utd', 'Chelsea'],
+    options=team_options,
+    default=[t for t in ['Manchester City', 'Manchester Utd', 'Chelsea']
+             if t in team_options],
 )
 
 # Radio to select trendline or zones to scatterplot
@@ -198,6 +188,15 @@ graph_trend = st.sidebar.radio(
     index=1,
 )
 
+# Selectbox to choose the trend line fit. Only 'LOWESS (statsmodels)' loads
+# statsmodels
+if graph_trend == 'Trend line':
+    trend_type = st.sidebar.selectbox(
+        label='Type of Trend Line',
+        options=FITS,
+        index=0,
+    )
+
 # Selectbox to choose type of zone lines
 if graph_trend == 'Zones':
     zone_lines_type = st.sidebar.selectbox(
@@ -211,17 +210,19 @@ st.sidebar.divider()
 st.sidebar.subheader('Format graph')
 
 graph_title = st.sidebar.text_input(label='Title',
-                                    value='Scatter plot - Premier League 22/23')
+                                    value=f'Scatter plot - {dataset.title}')
 
 # Player annotations
 st.sidebar.divider()
 st.sidebar.subheader('Player tags')
 
+player_options = df.player.unique().tolist()
 players = st.sidebar.multiselect(
     label='Highlight player',
-    options=df.player.unique(),
-    default=['Erling Haaland', 'Kevin De Bruyne',
-             'Marcus Rashford', 'Enzo Fernández'],
+    options=player_options,
+    default=[p for p in ['Erling Haaland', 'Kevin De Bruyne',
+                         'Marcus Rashford', 'Enzo Fernández']
+             if p in player_options],
 )
 
 a_c = st.sidebar.color_picker('Arrow Color', value='#FFFFFF')
@@ -293,221 +294,61 @@ st.divider()
 # ------------------------------ Scatter 1 ------------------------------------
 # val_x = 'npxG'
 # val_y = 'CarriesToFinalThird'
-df = make_p90(df, val_x)
-df = make_p90(df, val_y)
-
-# fig = go.Figure()
-
-# Draw 'other' player markers
-
-df1 = df[~df['team'].isin(teams)]
-df1 = df1[~df['player'].isin(players)]
-
-fig = px.scatter(
-    df1,
-    x=val_x,
-    y=val_y,
-    # customdata=np.stack([df['player']]),
-    # name=customdata[0],
-    hover_name='player',
-    hover_data='team',
-    width=800, height=500,
-)
-
-fig.update_layout(
-    margin=dict(
-        # l=20,
-        r=40,
-        # t=20,
-        # b=20,
-    ),
-    paper_bgcolor="#050505",
-    # paper_bgcolor='#faf9f4',
-    plot_bgcolor='#131313',
-
-)
-
-# Update 'other players' markers
-fig.update_traces(
-    marker_size=10,
-    marker_color='grey',
-    marker_line_width=1,
-    opacity=1,
-    marker_line_color='#0A0A0A',
-)
-
-# Plot markers from highlighted teams
-if teams:
-    for team in teams:
-        df1 = df[df['team'] == team]
-        fig = fig.add_scatter(
-            x=df1[val_x],
-            y=df1[val_y],
-            mode='markers',
-            name=team,
-            hovertext=df1.player.to_list(),
-            legendgroup=team,
-            # Styling
-            marker_size=12,
-            marker_color='white',
-            marker_line_color='red',
-            # marker_symbol='x',
-            # marker_opacity=0.5,
-            # opacity=0.5,
-        )
-
-# Update markers from highlighted teams
-if teams:
-    for team in teams:
-        fig = fig.update_traces(
-            selector={'legendgroup': team},
-            # marker_color='red',
-            marker_line_color=team_colours[team][1],
-            marker_color=team_colours[team][0],
-            marker_line_width=2.5,
-        )
-
-# Highlight players and add sidebar elements to edit each annotation
-if players:
-    for pl in players:
-        with st.sidebar.expander(pl):
-            ax = st.text_input(label='ax',
-                               value=45,
-                               key=f'{pl}_ax')
-
-            ay = st.text_input(label='ay',
-                               value=-30,
-                               key=f'{pl}_ay')
-
-            t = st.text_input(label='Text',
-                              value=pl,
-                              key=f'{pl}_text')
-
-            show_a = st.radio(label='Show arrow',
-                              options=[True, False],
-                              key=f'{pl}_show')
-            x_s = st.text_input(label='x shift',
-                                value=0,
-                                key=f'{pl}_xshift')
-            y_s = st.text_input(label='y shift',
-                                value=0,
-                                key=f'{pl}_yshift')
-            marker_c = st.color_picker(label='Marker Color',
-                                       value='#FFFFFF',
-                                       key=f'{pl}_mc')
-
-        # Create temporary dataset for highlighted player
-        dff = df[df['player'] == pl]
-        x = dff[val_x].values[0]
-        y = dff[val_y].values[0]
-
-        # Add a marker for each player
-        fig = fig.add_scatter(
-            x=dff[val_x],
-            y=dff[val_y],
-            mode='markers',
-            name=dff.team.values[0],
-            hovertext=dff.player.to_list(),
-            legendgroup=dff.team.values[0],
-            showlegend=False,
-            # Styling
-            marker_size=12,
-            marker_color=marker_c,
-            marker_line_color='red',
-            # marker_symbol='x',
-            # marker_opacity=0.5,
-            # opacity=0.5,
-        )
-
-        fig.add_annotation(
-            x=x,
-            y=y,
-            ax=ax,
-            ay=ay,
-            text=t,
-            arrowcolor=a_c,
-            arrowsize=0.3,
-            showarrow=show_a,
-            xshift=float(x_s),
-            yshift=float(y_s),
-        )
-
-# Add Trend line or add zones
-if graph_trend == 'Trend line':
-    fit_results = sm.OLS(
-        df[val_y].values,
-        sm.add_constant(df[val_x].values),
-        missing="drop"
-    ).fit()
-
-    trend_y = fit_results.predict()
-
-    fig = fig.add_trace(
-        go.Scatter(
-            x=df[val_x],
-            y=trend_y,
-            showlegend=False,
-            mode='lines',
-            line_color='blue',
-        )
-    )
-
-elif graph_trend == 'Zones':
-
-    if zone_lines_type == 'Median':
-        hline_val = np.median(df[val_y])
-        vline_val = np.median(df[val_x])
-
-    elif zone_lines_type == 'Average':
-        hline_val = np.average(df[val_y])
-        vline_val = np.average(df[val_x])
-
-    # Add median line for y-axis
-    fig.add_hline(
-        y=hline_val,
-        line_dash="dot",
-        line_color="white"
-    )
-
-    # Add median line for x-axis
-    fig.add_vline(
-        x=vline_val,
-        line_dash="dot",
-        line_color="white"
-    )
-
-    # Add zone color backgrounds
-    # draw_zones(fig, df, val_x, val_y, hline_val, vline_val)
-
-fig.update_layout(
-    title_text=graph_title,
-    title_font_size=25,
-    title_automargin=True,
-
-)
-
-# Add Credits
-x = 1.01
-y = 0
-ydiff = 0.05
-# c = '#0b4393'
-c = '#358CFF'
-fig.add_annotation(x=x, y=y,
-                   xref="paper", yref="paper",
-                   text="Daniel Granja C.",
-                   font_color=c,
-                   font_size=16,
-                   showarrow=False,
-                   yshift=10)
-
-fig.add_annotation(x=x, y=y-ydiff,
-                   xref="paper", yref="paper",
-                   text="@DGCFutbol",
-                   font_color=c,
-                   font_size=15,
-                   showarrow=False,
-                   yshift=10)
-
+# Stats made p90 where applicable, precomputed once per dataset. Taken as
+# columns so val_x == val_y is only normalised once
+df = scatter_rows(dataset, val_x, val_y, z1, z2)
+
+# Sidebar elements to edit each player's annotation
+tags = {}
+for pl in players:
+    with st.sidebar.expander(pl):
+        ax = st.text_input(label='ax',
+                           value=45,
+                           key=f'{pl}_ax')
+
+        ay = st.text_input(label='ay',
+                           value=-30,
+                           key=f'{pl}_ay')
+
+        t = st.text_input(label='Text',
+                          value=pl,
+                          key=f'{pl}_text')
+
+        show_a = st.radio(label='Show arrow',
+                          options=[True, False],
+                          key=f'{pl}_show')
+        x_s = st.text_input(label='x shift',
+                            value=0,
+                            key=f'{pl}_xshift')
+        y_s = st.text_input(label='y shift',
+                            value=0,
+                            key=f'{pl}_yshift')
+        marker_c = st.color_picker(label='Marker Color',
+                                   value='#FFFFFF',
+                                   key=f'{pl}_mc')
+
+    tags[pl] = dict(ax=ax, ay=ay, text=t, show=show_a, x_shift=x_s,
+                    y_shift=y_s, color=marker_c)
+
+# All players in one WebGL trace, highlighted teams and players styled per
+# point. Rebuilt only when the data or the highlights change; editing the
+# title or a tag patches the cached spec
+spec = base_scatter(dataset, dataset.version, val_x, val_y, z1, z2,
+                    tuple(teams),
+                    tuple((pl, tag['color']) for pl, tag in tags.items()),
+                    trend_type if graph_trend == 'Trend line' else None,
+                    zone_lines_type if graph_trend == 'Zones' else None)
+
+# Annotate highlighted players
+annotations = []
+for pl, tag in tags.items():
+    dff = df[df['player'] == pl]
+    x = dff[val_x].values[0]
+    y = dff[val_y].values[0]
+
+    annotations.append(tag_annotation(x, y, tag, a_c))
+
+fig = with_tags(spec, graph_title, annotations)
 
 st.plotly_chart(fig)
 
@@ -0,0 +1,212 @@
+"""
+Image assets: resized derivatives of the homepage images and decoded logos.
+
+The homepage used to send the full size PNGs in images/ to every visitor.
+build() writes WebP and PNG copies at the widths the page column is actually
+shown at (1x and 2x screens) to static/images/, plus a manifest.json with the
+size of each file and a content hash. Streamlit serves static/ under
+app/static/ (server.enableStaticServing), and every URL carries ?v=<hash>, so
+browsers keep the files for as long as the content does not change.
+
+The copies are built the first time the homepage asks for one, and again
+whenever the manifest no longer matches the source images (content hash,
+widths) or a file is missing. To build them ahead of time, e.g. in the
+deploy step:
+    python -m utils.assets
+
+Team logos drawn on the Chalkboard are decoded once per process with
+logo_image().
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from utils.lazy import lazy_import
+
+# Only needed to build the copies and decode logos, not to show them
+Image = lazy_import('PIL.Image')
+
+SOURCE_DIR = 'images'
+BUILD_DIR = 'static/images'
+MANIFEST = os.path.join(BUILD_DIR, 'manifest.json')
+
+# Served from the Streamlit static route, relative to the app
+STATIC_URL = 'app/static/images'
+
+HOMEPAGE_IMAGES = ['chelsea_passes', 'pizza', 'progression']
+
+# Width of the main page column, and twice that for high density screens
+WIDTHS = [704, 1408]
+FORMATS = {'webp': dict(quality=85, method=6),
+           'png': dict(optimize=True)}
+
+
+# ---------------------------------------------------------------------- BUILD
+def source_hash(name):
+    with open(os.path.join(SOURCE_DIR, f'{name}.png'), 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def write_file(path, data):
+    # Replaced in one step, so a page never serves a half written file
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def encode(image, format):
+    if format == 'png':
+        # The charts use few colors, a palette is a fifth of the size
+        image = image.quantize(256, method=Image.FASTOCTREE,
+                               dither=Image.NONE)
+    buf = io.BytesIO()
+    image.save(buf, format=format.upper(), **FORMATS[format])
+    return buf.getvalue()
+
+
+def derivatives(name, widths=WIDTHS):
+    """ Write the resized copies of images/<name>.png. Returns its manifest
+    entry: source size and, per format, [width, url] from small to large """
+    image = Image.open(os.path.join(SOURCE_DIR, f'{name}.png'))
+    image = image.convert('RGBA')
+    w, h = image.size
+
+    # Never upscale: the source width replaces the widths above it
+    sizes = sorted({min(width, w) for width in widths})
+
+    entry = {'width': w, 'height': h, 'source': source_hash(name),
+             'widths': list(widths), 'files': {}}
+    for fmt in FORMATS:
+        files = []
+        for width in sizes:
+            resized = image if width == w else \
+                image.resize((width, round(h * width / w)), Image.LANCZOS)
+            data = encode(resized, fmt)
+
+            file = f'{name}-{width}.{fmt}'
+            write_file(os.path.join(BUILD_DIR, file), data)
+
+            version = hashlib.sha1(data).hexdigest()[:10]
+            files.append([width, f'{STATIC_URL}/{file}?v={version}'])
+        entry['files'][fmt] = files
+
+    return entry
+
+
+def build(names=HOMEPAGE_IMAGES, widths=WIDTHS):
+    """ Write every derivative and the manifest. Returns the manifest """
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    entries = {name: derivatives(name, widths) for name in names}
+    write_file(MANIFEST, json.dumps(entries, indent=2).encode())
+
+    return entries
+
+
+def is_stale(names=HOMEPAGE_IMAGES, widths=WIDTHS):
+    """ Whether the manifest is missing, lists other sources or widths, or
+    points at files that are gone """
+    if not os.path.exists(MANIFEST):
+        return True
+    with open(MANIFEST) as f:
+        entries = json.load(f)
+
+    for name in names:
+        entry = entries.get(name)
+        if entry is None or entry.get('source') != source_hash(name) \
+                or entry.get('widths') != list(widths):
+            return True
+        for files in entry['files'].values():
+            for width, url in files:
+                file = url.split('?')[0].rsplit('/', 1)[-1]
+                if not os.path.exists(os.path.join(BUILD_DIR, file)):
+                    return True
+
+    return False
+
+
+# ------------------------------------------------------------------------ APP
+_build_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def manifest():
+    """ Built derivatives, (re)built on first use if stale. {} if they can
+    not be written, e.g. on a read-only deploy: pages then show the
+    originals """
+    with _build_lock:
+        try:
+            if is_stale():
+                return build()
+        except OSError:
+            return {}
+
+        with open(MANIFEST) as f:
+            return json.load(f)
+
+
+def picture(name, caption=''):
+    """ HTML <picture> of a built image: WebP with a PNG fallback, the
+    browser picks the width. None if the image was not built """
+    entry = manifest().get(name)
+    if entry is None:
+        return None
+
+    def srcset(fmt):
+        return ', '.join(f'{url} {width}w'
+                         for width, url in entry['files'][fmt])
+
+    # Largest PNG for browsers without srcset support
+    src = entry['files']['png'][-1][1]
+    return f'<figure style="margin: 0 0 1rem 0">' \
+           f'<picture>' \
+           f'<source type="image/webp" srcset="{srcset("webp")}" ' \
+           f'sizes="(max-width: 736px) 100vw, 704px">' \
+           f'<img src="{src}" srcset="{srcset("png")}" ' \
+           f'sizes="(max-width: 736px) 100vw, 704px" ' \
+           f'width="{entry["width"]}" height="{entry["height"]}" ' \
+           f'alt="{caption}" loading="lazy" decoding="async" ' \
+           f'style="width: 100%; height: auto">' \
+           f'</picture>' \
+           f'<figcaption style="text-align: center; font-size: 14px; ' \
+           f'opacity: 0.6">{caption}</figcaption>' \
+           f'</figure>'
+
+
+@lru_cache(maxsize=None)
+def logo_image(name):
+    """ Decoded RGBA array of images/<name>.png, shared by the process.
+    Read only """
+    with Image.open(os.path.join(SOURCE_DIR, f'{name}.png')) as image:
+        rgba = np.asarray(image.convert('RGBA'))
+    rgba.setflags(write=False)
+    return rgba
+
+
+def main():
+    start = time.perf_counter()
+    entries = build()
+
+    for name, entry in entries.items():
+        source = os.path.getsize(os.path.join(SOURCE_DIR, f'{name}.png'))
+        sizes = []
+        for fmt, files in entry['files'].items():
+            for width, _ in files:
+                path = os.path.join(BUILD_DIR, f'{name}-{width}.{fmt}')
+                sizes.append(f'{fmt} {width}px '
+                             f'{os.path.getsize(path) // 1024} KB')
+        sizes = ', '.join(sizes)
+        print(f'{name}: {source // 1024} KB -> {sizes}')
+
+    print(f'{len(entries)} images in {time.perf_counter() - start:.1f}s '
+          f'-> {BUILD_DIR}')
+
+
+if __name__ == '__main__':
+    main()
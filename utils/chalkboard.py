@@ -0,0 +1,889 @@
+"""
+Pass maps drawn on the Chalkboard page.
+
+Everything here runs without Streamlit so figures can be drawn in render
+worker processes. A figure is described by a spec: a dict of plain values
+and numpy arrays (titles, team color, pass coordinates in Opta units) built
+by the page. Styling that never changes lives in the parameters below.
+
+Maps with more than AGGREGATE_ABOVE passes are drawn in aggregate mode: a
+density of pass origins and binned flow arrows, whose cost does not depend on
+the number of passes.
+
+The static pitch layer of each layout is a PitchTemplate built once per
+process (and logo), so a render only draws the event layers.
+
+matplotlib and mplsoccer are imported lazily: the page imports this module
+for its constants and helpers, but only render workers draw.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from utils.assets import logo_image
+from utils.fonts import font
+from utils.lazy import lazy_import
+
+colors = lazy_import('matplotlib.colors')
+patches = lazy_import('matplotlib.patches')
+mplsoccer = lazy_import('mplsoccer')
+pitches = lazy_import('utils.pitches')
+
+# Layouts, named like the page tabs
+ONE_PLAYER = 'Un Jugador'
+THREE_PLAYERS = 'Tres Jugadores'
+
+LOGOS = {'Manchester United': 'mu',
+         'Arsenal': 'ar',
+         'Aston Villa': 'av',
+         'Chelsea': 'ch',
+         'Liverpool': 'li',
+         'Manchester City': 'mc',
+         'Newcastle United': 'nu',
+         'Tottenham': 'th',
+         'West Ham': 'wh'}
+
+
+# ------------------------------ FORMAT PLOT ----------------------------------
+# -------------------------- EDIT/CHANGE PARAMETERS
+# Figure
+margin1 = 5
+# Pitch Padding
+pitch_left_pad = 0
+pitch_right_pad = 0
+pitch_top_ad = 0
+pitch_bottom_pad = 0
+# pitch_bottom_pad = -35
+
+# Figure Background Color
+fig_bg_color = '#faf9f4'
+
+# Grid
+# Grid Settings
+# fig_w_pixels = 1000
+# fig_h_pixels = 1000
+# fig_width = fig_w_pixels/80
+# fig_height = fig_h_pixels/80
+nrows = 1
+ncols = 1
+max_grid = 1
+grid_space = 0
+
+# Figure ratios between sections (title, pitch, credits)
+
+
+title_h = 0.1  # the title takes up 15% of the fig height
+grid_h = 0.7  # the grid takes up 71.5% of the figure height
+endnote_h = 0.1  # endnote takes up 6.5% of the figure height
+
+grid_w = 0.5  # grid takes up 95% of the figure width
+left_p = 0.1
+
+title_space = 0.01  # 1% of fig height is space between pitch and title
+endnote_space = 0.00  # 1% of fig height is space between pitch and endnote
+
+space = 0.01  # 5% of grid_height is reserved for space between axes
+
+# --- Figure: Title
+# - Title
+title_x = 0.5
+title_y = 0.9
+title_ha = 'center'
+title_va = 'top'
+title_size = 17
+
+# - Subtitle1
+subtitle1_x = 0.5
+subtitle1_y = 0.38
+subtitle1_ha = 'center'
+subtitle1_va = 'center'
+subtitle1_size = 12
+
+subtitle1_color = "#030303"
+
+# - Subtitle2
+subtitle2_x = 0.5
+subtitle2_y = 0.2
+subtitle2_ha = 'center'
+subtitle2_va = 'center'
+subtitle2_size = 10
+
+subtitle2_text = f"23/24 | League only | Last 5 Matches | As of Nov 25, 2023"
+subtitle2_color = "#030303"
+
+# --- Figure: Pitch
+pitch_line_width = 0.8
+pitch_line_color = '#03191E'
+pitch_bg_color = '#faf9f4'
+
+
+event2_marker_color1 = '#B5B4B2'
+event_line_width1 = 1.8
+
+event_marker_width1 = 12
+
+is_line_transparent = True
+line_alpha_start = 0.1
+line_alpha_end = 1
+
+# Legend
+legend_ref = 'lower center'
+legend_loc = (0.5, -0.22)  # Loc. of the lower center of the Legend
+
+legend_bg_color = 'white'
+legend_edge_color = 'black'
+legend_text_color = 'black'
+legend_alpha = 1
+
+# --- Figure: Credits
+
+
+# --------------------------- PLOT 2 PARAMETERS -------------------------------
+# Figure
+margin = 7
+# Title
+title_size2 = 30
+
+title_x2 = 0.089
+title_y2 = 0.9
+title_ha2 = 'left'
+title_va2 = 'top'
+
+# Subtitle
+subtitle_size2 = 16
+
+subtitle1_x2 = 0.091
+subtitle1_y2 = 0.5725
+
+subtitle1_ha2 = 'left'
+subtitle1_va2 = 'top'
+
+# Font size
+player_names_size = 18  # Players name title over each pitch
+data1_size = 14  # Total passes text
+
+# Legend
+legend_ref2 = 'lower center'
+# legend_loc2 = (0.5, -0.008)  # Loc. of the lower center of the Legend
+legend_loc2 = (0.5, 0.1425)  # Loc. of the lower center of the Legend
+
+legend_bg_color2 = 'white'
+legend_edge_color2 = 'black'
+legend_text_color2 = 'black'
+legend_alpha2 = 1
+
+
+# Events
+event2_marker_color2 = event2_marker_color1
+# '#ef4146'  # chelsea red for markers facecolor
+event_line_width2 = 3
+
+event_marker_width2 = 12
+
+is_line_transparent = True
+line_alpha_start2 = 0.1
+line_alpha_end2 = 0.3
+
+# ------------------------------ AGGREGATE MODE -------------------------------
+# Above this many passes in a map, draw density and flow instead of every pass
+AGGREGATE_ABOVE = 300
+
+density_bins = (6, 4)  # Pitch split lengthwise x widthwise
+density_alpha = 0.6
+flow_bins = (6, 4)
+flow_arrow_length = 10
+
+# Opta pitch thirds (x) and channels (y, 0 is the right touchline)
+zone_thirds = ['Defensa', 'Medio', 'Ataque']
+zone_channels = ['Derecha', 'Centro', 'Izquierda']
+
+# --------------------------------- FUNCTIONS ---------------------------------
+def pass_arrays(df):
+    """ Start and end coordinates of the events in df, as float arrays """
+    return {c: df[c].to_numpy(dtype='float64')
+            for c in ['x', 'y', 'end_x', 'end_y']}
+
+
+def to_pitch(passes):
+    """ Opta coordinates to the Statsbomb pitch used by mplsoccer """
+    xstart, ystart = standardizer().transform(passes['x'], passes['y'])
+    xend, yend = standardizer().transform(passes['end_x'], passes['end_y'])
+    return xstart, ystart, xend, yend
+
+
+def zone_counts(df):
+    """ Passes, completed passes and accuracy between every pair of pitch
+    zones (thirds x channels), most used first """
+    edges = [100 / 3, 200 / 3]
+    names = np.array([f'{t} {c}' for t in zone_thirds for c in zone_channels])
+    n = len(names)
+
+    start = np.digitize(df['x'], edges) * 3 + np.digitize(df['y'], edges)
+    end = np.digitize(df['end_x'], edges) * 3 + np.digitize(df['end_y'], edges)
+    key = start * n + end
+    completed = (df['outcome_type'] == 'Successful').to_numpy()
+
+    total = np.bincount(key, minlength=n * n)
+    done = np.bincount(key, weights=completed, minlength=n * n).astype(int)
+    used = np.flatnonzero(total)
+
+    table = pd.DataFrame({'Desde': names[used // n],
+                          'Hasta': names[used % n],
+                          'Pases': total[used],
+                          'Completados': done[used]})
+    table['Precision (%)'] = (table['Completados'] / table['Pases'] * 100
+                              ).round(1)
+
+    return table.sort_values('Pases', ascending=False, kind='stable') \
+        .reset_index(drop=True)
+
+
+def player_summary(df):
+    """ Events, completed, missed, accuracy and share of the team's events
+    of every player in df, from a single groupby. Most events first """
+    outcome = df['outcome_type']
+    table = df.assign(completed=outcome.eq('Successful'),
+                      missed=outcome.eq('Unsuccessful')) \
+        .groupby('player') \
+        .agg(**{'Pases Totales': ('completed', 'size'),
+                'Completados': ('completed', 'sum'),
+                'Fallados': ('missed', 'sum')})
+
+    table['Precision (%)'] = (table['Completados'] / table['Pases Totales']
+                              * 100).round(1)
+    table['% del Equipo'] = (table['Pases Totales']
+                             / max(table['Pases Totales'].sum(), 1)
+                             * 100).round(1)
+
+    return table.sort_values('Pases Totales', ascending=False, kind='stable')
+
+
+def split_passes(df, players):
+    """ Completed and missed pass arrays of each player, from a single
+    groupby. Passes keep their order in df """
+    arrays = pass_arrays(df)
+    groups = df.groupby(['player', 'outcome_type']).indices
+    none = np.array([], dtype=int)
+
+    return {pl: {'completed': {c: v[groups.get((pl, 'Successful'), none)]
+                               for c, v in arrays.items()},
+                 'missed': {c: v[groups.get((pl, 'Unsuccessful'), none)]
+                            for c, v in arrays.items()}}
+            for pl in players}
+
+
+def draw_aggregate(pitch, ax, completed, missed, color, missed_color, lw,
+                   completed_label, missed_label):
+    """ Density of where passes start, plus the average direction and length
+    of completed passes per zone. Cost does not grow with the number of
+    passes beyond the binning """
+    cx, cy, cex, cey = to_pitch(completed)
+    mx, my, _, _ = to_pitch(missed)
+
+    x, y = np.concatenate([cx, mx]), np.concatenate([cy, my])
+    if len(x):
+        stats = pitch.bin_statistic(x, y, statistic='count',
+                                    bins=density_bins, normalize=True)
+        cmap = colors.LinearSegmentedColormap.from_list(
+            'density', [pitch_bg_color, color])
+        pitch.heatmap(stats, ax=ax, cmap=cmap, alpha=density_alpha,
+                      edgecolor=fig_bg_color)
+
+    if len(cx):
+        pitch.flow(cx, cy, cex, cey,
+                   bins=flow_bins,
+                   arrow_type='scale',
+                   arrow_length=flow_arrow_length,
+                   color=color,
+                   ax=ax)
+
+    # Same legend entries as the per pass map
+    ax.plot([], [], color=missed_color, lw=lw, label=missed_label)
+    ax.plot([], [], color=color, lw=lw, label=completed_label)
+
+
+# ----------------------------- SETUP FIGURE
+def one_player_thirds(ax):
+    """ Thirds lines of the single player map. Passes are drawn both under
+    and over them, so they go with the events, not the static layer """
+    x, _ = standardizer().transform([1 / 3 * 100, 2 / 3 * 100], [0, 0])
+
+    ax.vlines(
+        x=x,
+        ymin=-1,
+        ymax=81,
+        colors='black',
+        linestyles='dashed',
+        alpha=0.5,
+        clip_on=False,
+    )
+
+
+def three_player_thirds(ax):
+    """ Thirds lines of a three player map, see one_player_thirds() """
+    y, _ = standardizer().transform([1/3 * 100, 2/3 * 100], [0, 0])
+
+    ax.hlines(
+        y=y,
+        xmin=-1,
+        xmax=81,
+        colors='black',
+        linestyles='dashed',
+        alpha=0.4,
+        clip_on=False,
+    )
+
+
+def one_player_pitch():
+    """ Static layer of the single player map """
+    pitch = mplsoccer.Pitch(
+        # axis=True,
+        # label=True,
+        # tick=True,
+        goal_type='box',
+        line_color=pitch_line_color,
+        # line_alpha=0.5,
+        linewidth=pitch_line_width,
+
+        # bring the left axis in 10 data units (reduce the size)
+        pad_left=pitch_left_pad,
+        # bring the right axis in 10 data units (reduce the size)
+        pad_right=pitch_right_pad,
+        # extend the top axis 10 data units
+        pad_top=pitch_top_ad,
+        # extend the bottom axis 20 data units
+        pad_bottom=pitch_bottom_pad,
+    )
+
+    fig, axs = pitch.grid(
+        nrows=1, ncols=1,
+        figheight=7,
+
+        title_height=title_h,  # the title takes up 15% of the fig height
+        grid_height=grid_h,  # the grid takes up 71.5% of the figure height
+        endnote_height=endnote_h,  # endnote takes up 6.5% of the figure height
+        #
+        grid_width=grid_w,  # gris takes up 95% of the figure width
+        #
+        # # 1% of fig height is space between pitch and title
+        title_space=title_space,
+        #
+        # # 1% of fig height is space between pitch and endnote
+        endnote_space=endnote_space,
+        #
+        space=space,  # 5% of grid_height is reserved for space between axes
+        #
+        # # centers the grid horizontally / vertically
+        left=left_p,
+        bottom=None,
+        axis=False,
+    )
+
+    # Add 'Direction of Play' Arrow
+    l1 = patches.FancyArrow(x=0.2, y=0.1, dx=0.3, dy=0,
+                    transform=fig.transFigure, figure=fig,
+                    length_includes_head=True,
+                    head_length=0.01,
+                    head_width=0.0225,
+                    color='black')
+
+    fig.lines.extend([l1])
+
+    axs['pitch'].text(x=60, y=84,
+                      s='Dirección de Ataque',
+                      ha='center',
+                      size='10.5',
+)
+
+    # Figure background color
+    fig.patch.set_facecolor(fig_bg_color)
+    # Pitch background color
+    axs['pitch'].set_facecolor(pitch_bg_color)
+
+    # Add invisible text to add margins
+    axs['pitch'].text(
+        x=-margin1,
+        y=60,
+        s='o',
+        c=fig_bg_color,
+        # c='red',
+        ha='center',
+    )
+    axs['pitch'].text(
+        x=120+margin1,
+        y=60,
+        s='o',
+        c=fig_bg_color,
+        # c='red',
+        ha='center',
+    )
+
+    return pitch, fig, axs
+
+
+def draw_one_player(spec):
+    """ Pass map of one player. spec holds the title, subtitle, team color,
+    the completed and missed passes and their legend labels """
+    template = pitch_template(ONE_PLAYER)
+    fig, axs = template.figure()
+    pitch = template.pitch
+    one_player_thirds(axs['pitch'])
+    event1_marker_color1 = spec['color']
+
+    # Add title
+    axs['title'].text(
+        x=title_x,
+        y=title_y,
+        s=spec['title'],
+        size=title_size,
+        ha=title_ha,
+        va=title_va,
+    )
+
+    # Add subtitle 1
+    axs['title'].text(
+        x=subtitle1_x,
+        y=subtitle1_y,
+        s=spec['subtitle'],
+        size=subtitle1_size,
+        ha=subtitle1_ha,
+        va=subtitle1_va,
+        fontproperties=font('bold'),
+        color=subtitle1_color,
+    )
+
+    # # Add subtitle 2
+    # axs['title'].text(
+    #     x=subtitle2_x,
+    #     y=subtitle2_y,
+    #     s=subtitle2_text,
+    #     size=subtitle2_size,
+    #     ha=subtitle2_ha,
+    #     va=subtitle2_va,
+    #     fontproperties=font('bold'),
+    #     color=subtitle2_color,
+    # )
+
+    # axs['pitch'].set_ylabel('Undamped')
+    # axs['pitch'].set_axis = True
+
+    # Draw passes
+    if spec['event'] == 'Pass' and spec['aggregate']:
+        draw_aggregate(pitch, axs['pitch'],
+                       spec['completed'], spec['missed'],
+                       event1_marker_color1, event2_marker_color1,
+                       event_line_width1,
+                       spec['completed_label'], spec['missed_label'])
+
+    elif spec['event'] == 'Pass':
+        # Unsuccessful Passes
+        xstart, ystart, xend, yend = to_pitch(spec['missed'])
+
+        pitch.lines(
+            xstart=xstart,
+            ystart=ystart,
+            xend=xend,
+            yend=yend,
+            comet=is_line_transparent,
+            # color='#c1c1bf', # BenGriffis gray
+            color=event2_marker_color1,
+            ax=axs['pitch'],
+            lw=event_line_width1,
+            label=spec['missed_label'],
+            transparent=is_line_transparent,
+            alpha_start=line_alpha_start,
+            alpha_end=line_alpha_end,
+        )
+
+        pitch.scatter(
+            x=xend,
+            y=yend,
+            ax=axs['pitch'],
+            s=event_marker_width1,
+            linewidth=0,
+            marker='o',
+            facecolor=event2_marker_color1,
+        )
+
+        # Successful Passes
+        xstart, ystart, xend, yend = to_pitch(spec['completed'])
+
+        pitch.lines(
+            xstart=xstart,
+            ystart=ystart,
+            xend=xend,
+            yend=yend,
+            comet=True,
+            color=event1_marker_color1,
+            ax=axs['pitch'],
+            lw=event_line_width1,
+            label=spec['completed_label'],
+            transparent=is_line_transparent,
+            alpha_start=line_alpha_start,
+            alpha_end=line_alpha_end,
+        )
+
+        pitch.scatter(
+            x=xend,
+            y=yend,
+            ax=axs['pitch'],
+            s=event_marker_width1,
+            marker='o',
+            facecolor=event1_marker_color1,
+        )
+
+    # # Add 'Middle 3rd' and 'Final 3rd' Labels
+    # props = dict(
+    #     boxstyle='round, pad=0.9',
+    #     facecolor=fig_bg_color,
+    #     alpha=0.5
+    # )
+
+    # axs['pitch'].add_patch(Rectangle((1, 1), 2, 6,
+    #              edgecolor = 'pink',
+    #              facecolor = 'blue',
+    #              fill=True,
+    #              lw=5)
+    #                        )
+
+    # axs['pitch'].text(
+    #     x=83,
+    #     y=68,
+    #     s='Middle 3rd',
+    #     rotation=270,
+    #     size=15,
+    #     verticalalignment='top',
+    #     # bbox=props,
+    # )
+
+    # ------------ Add Legend
+    legend = axs['pitch'].legend(
+        facecolor=legend_bg_color,
+        # handlelength=5,
+        edgecolor=legend_edge_color,
+        prop=font('normal'),
+        labelcolor=legend_text_color,
+        framealpha=legend_alpha,
+        loc=legend_ref,
+        bbox_to_anchor=legend_loc,
+    )
+
+    # ------------ Add Credits
+    fig.text(
+        0.597,
+        0.17,
+        '@DGCFutbol',
+        va='top',
+        ha='right',
+        fontsize=11,
+        weight='bold',
+        fontproperties=font('normal'),
+        color=event1_marker_color1,
+        alpha=0.3,
+    )
+
+    axs['endnote'].text(
+        1,
+        0.1,
+        'Gráficos: Daniel Granja C.\n@DGCFutbol',
+        va='top',
+        ha='right',
+        fontsize=9,
+        weight='bold',
+        fontproperties=font('normal'),
+        color=event1_marker_color1,
+        alpha=0.4,
+    )
+
+    return fig
+
+
+def three_player_pitch(logo=None):
+    """ Static layer of the three player maps, with the team logo """
+    pitch2 = mplsoccer.VerticalPitch(
+        # axis=True,
+        # label=True,
+        # tick=True,
+        goal_type='box',
+        line_color=pitch_line_color,
+        # line_alpha=0.5,
+        linewidth=pitch_line_width * 2,
+
+        # bring the left axis in 10 data units (reduce the size)
+        pad_left=pitch_left_pad,
+        # bring the right axis in 10 data units (reduce the size)
+        pad_right=pitch_right_pad,
+        # extend the top axis 10 data units
+        pad_top=pitch_top_ad,
+        # extend the bottom axis 20 data units
+        pad_bottom=0,
+    )
+
+    fig2, axs2 = pitch2.grid(
+        nrows=1, ncols=3,
+        figheight=10,
+
+        title_height=0.15,  # the title takes up 15% of the fig height
+        grid_height=0.7,  # the grid takes up 71.5% of the figure height
+        endnote_height=0.03,  # endnote takes up 6.5% of the figure height
+
+        grid_width=0.5,  # gris takes up 95% of the figure width
+
+        # 1% of fig height is space between pitch and title
+        title_space=0.035,
+
+        # 1% of fig height is space between pitch and endnote
+        endnote_space=0.01,
+
+        space=0.1,  # 5% of grid_height is reserved for space between axes
+
+        # centers the grid horizontally / vertically
+        left=0,
+        bottom=None,
+        axis=False,
+    )
+
+    # Figure background color
+    fig2.patch.set_facecolor(fig_bg_color)
+
+    # Add invisible text to add margins
+    axs2['pitch'][0].text(
+        x=-margin,
+        y=50,
+        s='o',
+        c=fig_bg_color,
+    )
+    axs2['pitch'][-1].text(
+        x=80+margin,
+        y=50,
+        s='o',
+        c=fig_bg_color,
+    )
+
+    # Add team logo
+    if logo is not None:
+        newax = fig2.add_axes([0, 0.855, 0.111, 0.111], anchor='W', zorder=1)
+        newax.imshow(logo_image(logo))
+        newax.axis('off')
+
+    for ax in axs2['pitch']:
+        # Pitch background color
+        ax.set_facecolor(pitch_bg_color)
+
+    return pitch2, fig2, axs2
+
+
+def draw_three_players(spec):
+    """ Pass maps of three players side by side. spec holds the titles, team
+    color and logo, and per player its name, pass counts and passes """
+    template = pitch_template(THREE_PLAYERS, spec['logo'])
+    fig2, axs2 = template.figure()
+    pitch2 = template.pitch
+    for ax in axs2['pitch']:
+        three_player_thirds(ax)
+    event1_marker_color1 = event1_marker_color2 = spec['color']
+    players = spec['players']
+
+    # Add title
+    axs2['title'].text(
+        x=title_x2,
+        y=title_y2,
+        s=spec['title'],
+        size=title_size2,
+        ha=title_ha2,
+        va=title_va2,
+        # weight='bold',
+    )
+
+    # Add subtitle 1
+    axs2['title'].text(
+        x=subtitle1_x2,
+        y=subtitle1_y2,
+        s=spec['subtitle'],
+        size=subtitle_size2,
+        ha=subtitle1_ha2,
+        va=subtitle1_va2,
+        fontproperties=font('bold'),
+        color=subtitle1_color,
+        alpha=0.6,
+    )
+
+    for i, ax in enumerate(axs2['pitch'].flat[:len(players)]):
+        player = players[i]
+        label_completed = f'{player["successful"]} completed'
+        label_missed = f'{player["events"] - player["successful"]} missed'
+
+        # Player names
+        player_names = axs2['pitch'][i].text(
+            40, 126, player['name'],
+            ha='center',
+            # va='center',
+            # weight='bold',
+            alpha=0.7,
+            fontsize=player_names_size,
+        )
+
+        # Data 1
+        data_label = axs2['pitch'][i].text(
+            40, 121.5,
+            f'{player["events"]} Passes'
+            f' - {player["accuracy"]}% Accuracy',
+            ha='center',
+            alpha=0.7,
+            # va='center',
+            fontsize=data1_size,
+        )
+
+        if spec['aggregate']:
+            draw_aggregate(pitch2, axs2['pitch'][i],
+                           player['completed'], player['missed'],
+                           event1_marker_color1, event2_marker_color1,
+                           event_line_width2,
+                           label_completed,
+                           label_missed)
+
+        else:
+            # Unsuccessful Passes
+            xstart, ystart, xend, yend = to_pitch(player['missed'])
+
+            pitch2.lines(
+                xstart=xstart,
+                ystart=ystart,
+                xend=xend,
+                yend=yend,
+                comet=is_line_transparent,
+                # color='#c1c1bf', # BenGriffis gray
+                color=event2_marker_color1,
+                ax=axs2['pitch'][i],
+                lw=event_line_width2,
+                label=label_missed,
+
+                transparent=is_line_transparent,
+                alpha_start=line_alpha_start2,
+                alpha_end=line_alpha_end2,
+            )
+
+            pitch2.scatter(
+                x=xend,
+                y=yend,
+                ax=axs2['pitch'][i],
+                s=event_marker_width2,
+                linewidth=0,
+                marker='o',
+                facecolor=event2_marker_color2,
+            )
+
+            # Successful Passes
+            xstart, ystart, xend, yend = to_pitch(player['completed'])
+
+            pitch2.lines(
+                xstart=xstart,
+                ystart=ystart,
+                xend=xend,
+                yend=yend,
+                comet=True,
+                color=event1_marker_color1,
+                ax=axs2['pitch'][i],
+                lw=event_line_width2,
+                label=label_completed,
+                transparent=is_line_transparent,
+                alpha_start=line_alpha_start2,
+                alpha_end=line_alpha_end2,
+            )
+
+            pitch2.scatter(
+                x=xend,
+                y=yend,
+                ax=axs2['pitch'][i],
+                s=event_marker_width2,
+                marker='o',
+                facecolor=event1_marker_color2,
+                # facecolor='#ef4146',
+                zorder=2,
+            )
+
+        # ------------ Add Legend
+        # Trick to return handles and labels and show them in reversed order
+        handles, labels = axs2['pitch'][i].get_legend_handles_labels()
+        order = [1, 0]
+        # legend = axs2['pitch'][i].legend(
+        #     [handles[idx] for idx in order],
+        #     [labels[idx] for idx in order],
+        #     facecolor=legend_bg_color2,
+        #     # reverse=True,
+        #     # handlelength=5,
+        #     edgecolor=legend_edge_color2,
+        #     prop=font('normal'),
+        #     labelcolor=legend_text_color2,
+        #     framealpha=legend_alpha2,
+        #     loc=legend_ref2,
+        #     bbox_to_anchor=legend_loc2,
+        #     fontsize='large',
+        # )
+
+        legend_y = -5
+        legend_completedt2 = axs2['pitch'][i].text(
+            x=40,
+            y=legend_y,
+            s=label_completed,
+            ha='center',
+            size=15,
+            color=event1_marker_color2,
+        )
+
+        legend_missed2 = axs2['pitch'][i].text(
+            x=40,
+            y=legend_y - 4.5,
+            s=label_missed,
+            ha='center',
+            size=15,
+            color=event2_marker_color2,
+        )
+
+    # ------------ Add Credits
+    # Twitter Account
+    tw_account = axs2['title'].text(
+        1,
+        .95,
+        '@DGCFutbol',
+        va='top',
+        ha='right',
+        fontsize=15.5,
+        weight='bold',
+        fontproperties=font('normal'),
+        # color='#941C2F',
+        color=event1_marker_color1,
+        alpha=1,
+    )
+
+    # Source label
+    source = axs2['title'].text(
+        1,
+        .75,
+        'Source: \'Opta Sports\'',
+        va='top',
+        ha='right',
+        fontsize=13,
+        # weight='bold',
+        fontproperties=font('normal'),
+        color='#030303',
+        # color=event1_marker_color1,
+        alpha=0.7,
+    )
+
+    return fig2
+
+
+@lru_cache(maxsize=None)
+def standardizer():
+    """ Opta to Statsbomb coordinates """
+    return mplsoccer.Standardizer(pitch_from='opta', pitch_to='statsbomb')
+
+
+@lru_cache(maxsize=None)
+def pitch_template(layout, logo=None):
+    """ Static layer of a layout, drawn once per process and logo """
+    if layout == ONE_PLAYER:
+        return pitches.PitchTemplate(*one_player_pitch())
+    return pitches.PitchTemplate(*three_player_pitch(logo))
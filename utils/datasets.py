@@ -0,0 +1,152 @@
+"""
+Process-wide dataset handles shared by every page and browser session.
+
+st.cache_data hands each caller its own unpickled copy of the frame, so memory
+grew with every open session. Handles returned here come from
+st.cache_resource instead: one frame per (league, season) and server
+process, shared read-only, loaded the first time a page asks for it.
+
+pandas copy-on-write is enabled for the whole app, so any filtering or column
+assignment a page does on the shared frame produces a new frame (copying only
+the columns that are written) and never leaks into other sessions.
+"""
+import glob
+import os
+from functools import cached_property
+
+import pandas as pd
+import streamlit as st
+
+from utils.metrics import per90_table, registry
+from utils.percentiles import MIN_90S, cohort_index, percentile_table
+from utils.profiles import PlayerIndex
+from utils.ranking import RankingIndex
+from utils.store import (STORE_ROOT, ensure_store, list_slices, league_name,
+                         load_table, season_name, slice_path)
+
+pd.set_option('mode.copy_on_write', True)
+
+# Slices kept in memory per server process. Least recently used ones are
+# dropped.
+MAX_LOADED_SLICES = 10
+
+
+class Dataset:
+    """ Read-only season table plus a version tag for derived caches """
+
+    def __init__(self, frame, league, season, version):
+        self._frame = frame
+        self.league = league
+        self.season = season
+        self.version = version
+
+    @property
+    def frame(self):
+        return self._frame
+
+    @cached_property
+    def metrics(self):
+        return registry(self._frame)
+
+    @cached_property
+    def per90(self):
+        """ Stat columns normalised per 90 minutes, computed once per slice
+        and shared like the frame itself """
+        return per90_table(self._frame)
+
+    @cached_property
+    def cohorts(self):
+        """ Row positions of each position group """
+        return cohort_index(self._frame)
+
+    @cached_property
+    def ranking(self):
+        """ Per-90 values presorted by 90s within each position """
+        return RankingIndex(self._frame, self.per90)
+
+    @cached_property
+    def players(self):
+        """ Player id index """
+        return PlayerIndex(self._frame)
+
+    def percentiles(self, min_90s=MIN_90S, cohort=None):
+        """ Percentile table against all players, or only a position group
+        """
+        return get_percentiles(self, self.version, min_90s, cohort)
+
+    def profile(self, player_id, metrics, team=None, min_90s=MIN_90S,
+                cohort=None):
+        return self.players.profile(player_id,
+                                    metrics,
+                                    self.per90,
+                                    self.percentiles(min_90s, cohort),
+                                    team)
+
+    @property
+    def title(self):
+        return f'{league_name(self.league)} {season_name(self.season)}'
+
+    def __len__(self):
+        return len(self._frame)
+
+
+def table_version(league, season):
+    """ Changes whenever the slice file is rewritten, e.g. after the store is
+    rebuilt from updated sources """
+    ensure_store()
+    stat = os.stat(slice_path(league, season))
+    return f'{league}-{season}-{stat.st_mtime_ns}-{stat.st_size}'
+
+
+@st.cache_resource(max_entries=MAX_LOADED_SLICES)
+def get_dataset(league, season, version):
+    """ Season table, cached per version like get_percentiles, so a rewritten
+    slice is loaded again instead of served stale """
+    frame = load_table(league, season)
+    return Dataset(frame, league, season, version)
+
+
+@st.cache_resource(max_entries=MAX_LOADED_SLICES * 10)
+def get_percentiles(_dataset, version, min_90s, cohort):
+    """ Percentile table, cached per dataset version, minutes threshold and
+    cohort """
+    rows = None if cohort is None else _dataset.cohorts[cohort]
+    return percentile_table(_dataset.frame,
+                            _dataset.per90,
+                            _dataset.metrics,
+                            min_90s,
+                            rows)
+
+
+def catalog_version():
+    """ Changes whenever a league or season slice is added or removed, i.e.
+    with the modification times of the store and its league directories """
+    ensure_store()
+    dirs = [STORE_ROOT] + sorted(glob.glob(os.path.join(STORE_ROOT, '*', '')))
+    return tuple(os.stat(d).st_mtime_ns for d in dirs)
+
+
+@st.cache_data()
+def get_catalog(version):
+    return list_slices()
+
+
+def select_dataset(container=st):
+    """ League and season selectors. Returns the selected dataset """
+    catalog = get_catalog(catalog_version())
+
+    leagues = list(dict.fromkeys(league for league, _ in catalog))
+    league = container.selectbox(
+        label='Liga',
+        options=leagues,
+        format_func=league_name,
+    )
+
+    seasons = [season for lg, season in catalog if lg == league]
+    season = container.selectbox(
+        label='Temporada',
+        options=seasons,
+        format_func=season_name,
+    )
+
+    return get_dataset(league, season, table_version(league, season))
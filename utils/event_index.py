@@ -0,0 +1,114 @@
+"""
+In-memory query engine for the Chalkboard filters.
+
+Events are sorted by (team, opponent, type) once, so every group, and every
+head-to-head (the events of a team against one opponent), is a contiguous
+range of rows, found with dict lookups however many rivals are selected.
+Within every group the row positions are also kept sorted on x, end_x and
+length, so a range filter on any of them is two searchsorted calls. A query
+slices each selected group on its most selective range and only checks the
+other ranges on the rows in that slice, so its cost follows the size of the
+result rather than of the season.
+"""
+import numpy as np
+import pandas as pd
+
+# Columns range filters can be run on
+RANGE_COLUMNS = ['x', 'end_x', 'length']
+
+
+def opponents(df):
+    """ Opponent of the team of every event, from the home and away columns """
+    return pd.Series(np.where(df['home'] == df['team'], df['away'],
+                              df['home']),
+                     index=df.index)
+
+
+class EventIndex:
+
+    def __init__(self, df):
+        # Stable, so events keep their order within a group
+        keys = pd.DataFrame({'team': df['team'].to_numpy(),
+                             'opponent': opponents(df).to_numpy(),
+                             'type': df['type'].to_numpy()}) \
+            .sort_values(['team', 'opponent', 'type'], kind='stable')
+        self.df = df.iloc[keys.index].reset_index(drop=True)
+        keys = keys.reset_index(drop=True)
+        self.values = {c: self.df[c].to_numpy(dtype='float64')
+                       for c in RANGE_COLUMNS}
+
+        # (team, opponent, type) -> rows, and per range column the sorted
+        # values with their row positions. Missing values sort last and never
+        # fall inside a range
+        self.groups = {}
+        # team -> opponent -> event types, so the groups of a head-to-head
+        # are lookups rather than a scan of every group
+        self.fixtures = {}
+        for key, rows in keys.groupby(list(keys)).indices.items():
+            by_column = {}
+            for c in RANGE_COLUMNS:
+                order = rows[np.argsort(self.values[c][rows], kind='stable')]
+                by_column[c] = (self.values[c][order], order)
+            self.groups[key] = (rows, by_column)
+
+            team, opponent, event_type = key
+            self.fixtures.setdefault(team, {}) \
+                .setdefault(opponent, []).append(event_type)
+
+    def group_keys(self, team, rivals, event_type=None):
+        """ Groups of a team against the rivals, of one or every type """
+        by_opponent = self.fixtures.get(team, {})
+        return [(team, r, t)
+                for r in rivals
+                for t in by_opponent.get(r, [])
+                if event_type is None or t == event_type]
+
+    def range_values(self, team, rivals, event_type, column):
+        """ Sorted distinct values of a range column in the selected groups,
+        without missing values """
+        values = [self.groups[key][1][column][0]
+                  for key in self.group_keys(team, rivals, event_type)]
+        if not values:
+            return np.array([])
+
+        values = np.unique(np.concatenate(values))
+        return values[~np.isnan(values)]
+
+    def select(self, team, rivals, event_type=None, **ranges):
+        """ Row positions of the events in the selected groups with
+        lo <= column <= hi for every column=(lo, hi) in ranges, in table
+        order """
+        ranges = {c: r for c, r in ranges.items() if r is not None}
+        selected = []
+
+        for key in self.group_keys(team, rivals, event_type):
+            rows, by_column = self.groups[key]
+
+            # Slice on the narrowest range
+            best = None
+            for c, (lo, hi) in ranges.items():
+                values, order = by_column[c]
+                i = np.searchsorted(values, lo, side='left')
+                j = np.searchsorted(values, hi, side='right')
+                if best is None or j - i < len(best[1]):
+                    best = (c, order[i:j])
+
+            if best is not None:
+                column, rows = best
+                for c, (lo, hi) in ranges.items():
+                    if c != column:
+                        values = self.values[c][rows]
+                        rows = rows[(values >= lo) & (values <= hi)]
+
+            selected.append(rows)
+
+        if not selected:
+            return np.array([], dtype=int)
+
+        return np.sort(np.concatenate(selected))
+
+    def query(self, team, rivals, event_type=None, columns=None, **ranges):
+        """ Events matching select(), as a DataFrame """
+        rows = self.select(team, rivals, event_type, **ranges)
+        df = self.df if columns is None else self.df[columns]
+        return df.iloc[rows]
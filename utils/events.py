@@ -0,0 +1,439 @@
+"""
+Partitioned on-disk store for the WhoScored/Opta event data.
+
+Events are written as a hive-partitioned Parquet dataset, one directory per
+team and match. A match is named by its season and fixture, so next
+season's Chelsea - Arsenal gets its own partition:
+
+    data/events/team=Chelsea/match=2324 Chelsea - Arsenal/part-base-0.parquet
+
+The exports carry no season column, so it is read from the file name, which
+starts with the season like data/2324_events.csv.
+
+Within each file rows are sorted by event type and pitch position, so a query
+for (team, rivals, event type) only opens the partitions of those matches and
+skips row groups whose statistics do not contain the event type.
+
+New matchweeks are appended as segments: their files are added next to the
+existing ones and nothing already stored is rewritten. _manifest.json lists
+the committed files and the segments of every partition. Readers only see
+files listed there, and the per partition segment list is the version used
+to invalidate cached results of the teams and matches that changed. An
+export is only ingested once; reingest replaces the stored events of its
+matches instead, e.g. after a corrected export. compact() merges the
+segment files of each partition back into one.
+
+Every committed manifest is a new generation. Files dropped from it, by
+compaction or a reingest, are listed as orphans and deleted by a compact()
+of a later generation once ORPHAN_GRACE has passed, so readers still on a
+snapshot that listed them can finish. Writers hold _manifest.lock, one at a
+time.
+
+Command line:
+    python -m utils.events build data/2324_events.csv data/events
+    python -m utils.events ingest data/2324_matchweek_13.csv data/events
+    python -m utils.events reingest data/2324_matchweek_13.csv data/events
+    python -m utils.events compact data/events
+"""
+import contextlib
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+PARTITION_COLUMNS = ['team', 'match']
+SORT_COLUMNS = ['type', 'x']
+ROWS_PER_GROUP = 1024
+MANIFEST = '_manifest.json'
+# Stores written with another partition layout are rebuilt by open_store()
+LAYOUT = 2
+WRITER_LOCK = '_manifest.lock'
+# Seconds an orphaned file is kept for readers that listed it
+ORPHAN_GRACE = 10 * 60
+
+partitioning = ds.partitioning(
+    pa.schema([('team', pa.string()), ('match', pa.string())]),
+    flavor='hive',
+)
+
+
+def match_key(season, home, away):
+    # Works for single team names as well as whole columns
+    return season + ' ' + home + ' - ' + away
+
+
+def parse_match(match):
+    """ (season, home, away) of a match key """
+    season, fixture = match.split(' ', 1)
+    home, away = fixture.split(' - ', 1)
+    return season, home, away
+
+
+def season_of(csv_path):
+    """ Season of an export, from the start of its file name """
+    found = re.match(r'(\d{4})_', os.path.basename(csv_path))
+    if found is None:
+        raise ValueError(f'{csv_path}: name exports <season>_..., e.g. '
+                         f'2324_events.csv')
+    return found.group(1)
+
+
+def partition_key(team, match):
+    return f'{team}/{match}'
+
+
+def fixture_index(partitions):
+    """ team -> opponent -> matches, from the partition keys of the
+    manifest. Teams and opponents are in alphabetical order """
+    index = {}
+    for key in sorted(partitions):
+        team, match = key.split('/', 1)
+        _, home, away = parse_match(match)
+        opponent = away if home == team else home
+        index.setdefault(team, {}).setdefault(opponent, []).append(match)
+
+    return {team: dict(sorted(by_opponent.items()))
+            for team, by_opponent in index.items()}
+
+
+# ------------------------------------------------------------------- MANIFEST
+def read_manifest(root):
+    with open(os.path.join(root, MANIFEST)) as f:
+        return json.load(f)
+
+
+def write_manifest(root, manifest):
+    manifest['generation'] = generation(manifest) + 1
+    path = os.path.join(root, MANIFEST)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def generation(manifest):
+    return manifest.get('generation', 0)
+
+
+def add_orphans(manifest, files):
+    """ Drop files from the store. They are deleted by a compact() of a later
+    generation, once the grace period has passed """
+    manifest.setdefault('orphans', []).extend(
+        {'file': f, 'generation': generation(manifest) + 1,
+         'time': time.time()}
+        for f in files)
+
+
+@contextlib.contextmanager
+def writer_lock(root):
+    """ Held by ingest() and compact() while they update the store, so
+    neither commits a manifest read before the other's commit """
+    with open(os.path.join(root, WRITER_LOCK), 'w') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)  # Released when f is closed
+            yield
+            return
+
+        while True:
+            try:
+                # Gives up after 10 seconds of retries
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                pass
+        try:
+            yield
+        finally:
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# ---------------------------------------------------------------------- WRITE
+def segment_name(name=None):
+    """ Unique segment name, so the files of two segments never share a path,
+    even when written within the same second """
+    name = name or time.strftime('%Y%m%d%H%M%S')
+    return f'{name}-{uuid.uuid4().hex[:8]}'
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def prepare_events(df):
+    """ Sort rows by partition, then for row group pruning """
+    return df.sort_values(PARTITION_COLUMNS + SORT_COLUMNS, kind='stable')
+
+
+def read_export(csv_path):
+    """ Events of an export, with their match key """
+    df = pd.read_csv(csv_path)
+    df = df.iloc[:, 1:]  # Drop the exported index column
+    return df.assign(
+        match=match_key(season_of(csv_path), df['home'], df['away']))
+
+
+def write_segment(df, root, segment):
+    """ Write events as new files of their partitions.
+
+    Returns {partition key: [relative file paths]} of the files written.
+    """
+    table = pa.Table.from_pandas(prepare_events(df), preserve_index=False)
+    written = {}
+
+    def visit(file):
+        rel = os.path.relpath(file.path, root)
+        keys = ds.get_partition_keys(
+            partitioning.parse(os.path.dirname(rel) + '/'))
+        key = partition_key(keys['team'], keys['match'])
+        written.setdefault(key, []).append(rel)
+
+    ds.write_dataset(
+        table,
+        root,
+        format='parquet',
+        partitioning=partitioning,
+        basename_template=f'part-{segment}-{{i}}.parquet',
+        max_rows_per_group=ROWS_PER_GROUP,
+        min_rows_per_group=ROWS_PER_GROUP,
+        existing_data_behavior='overwrite_or_ignore',
+        file_visitor=visit,
+    )
+
+    return written
+
+
+def build_store(csv_path, root):
+    """ Rewrite the whole event CSV export as a partitioned dataset """
+    # Build next to the final location and swap it in, so readers never see
+    # a half written store.
+    tmp = f'{root}.{os.getpid()}.tmp'
+    written = write_segment(read_export(csv_path), tmp, 'base')
+
+    partitions = {key: {'segments': ['base'], 'files': files}
+                  for key, files in written.items()}
+    write_manifest(tmp, {'layout': LAYOUT, 'partitions': partitions})
+
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    os.replace(tmp, root)
+
+    return root
+
+
+def ingest(csv_path, root, segment=None, replace=False):
+    """ Append the events of an export as a new segment.
+
+    Existing files are never modified: the new files are added to their
+    partitions next to the segments already there, and compact() merges
+    them later. An export that was already ingested is rejected, so its
+    events are never stored twice. With replace, the matches of the export
+    are reingested instead and their previous files become orphans.
+
+    The new files only become visible to readers once the manifest listing
+    them is replaced. Returns the partition keys that changed.
+    """
+    segment = segment_name(segment)
+    # The season is part of the events, read from the file name
+    digest = f'{season_of(csv_path)}-{file_digest(csv_path)}'
+    with writer_lock(root):
+        manifest = read_manifest(root)
+        sources = manifest.setdefault('sources', {})
+        if digest in sources and not replace:
+            raise ValueError(f'{csv_path} was already ingested as segment '
+                             f'{sources[digest]}, use reingest to replace '
+                             f'its matches')
+
+        written = write_segment(read_export(csv_path), root, segment)
+        sources[digest] = segment
+
+        for key, files in written.items():
+            entry = manifest['partitions'].setdefault(
+                key, {'segments': [], 'files': []})
+            if replace:
+                add_orphans(manifest, entry['files'])
+                entry['files'] = []
+            entry['segments'].append(segment)
+            entry['files'] += files
+
+        write_manifest(root, manifest)
+
+    return sorted(written)
+
+
+def compact(root):
+    """ Merge the segment files of every partition into a single file.
+
+    Orphans of an earlier generation whose grace period has passed are
+    deleted first. The files this run replaces become orphans in turn.
+    """
+    with writer_lock(root):
+        manifest = read_manifest(root)
+        now = time.time()
+        kept = []
+        for orphan in manifest.get('orphans', []):
+            if orphan['generation'] < generation(manifest) \
+                    and now - orphan['time'] >= ORPHAN_GRACE:
+                path = os.path.join(root, orphan['file'])
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                kept.append(orphan)
+        manifest['orphans'] = kept
+
+        segment = segment_name('compact')
+        compacted = []
+        for key, entry in manifest['partitions'].items():
+            if len(entry['files']) < 2:
+                continue
+
+            team, match = key.split('/', 1)
+            paths = [os.path.join(root, f) for f in entry['files']]
+            df = pd.concat([pd.read_parquet(p) for p in paths],
+                           ignore_index=True)
+            # Partition values live in the directory names
+            df = df.assign(team=team, match=match)
+
+            written = write_segment(df, root, segment)
+            add_orphans(manifest, entry['files'])
+            entry['files'] = written[key]
+            compacted.append(key)
+
+        write_manifest(root, manifest)
+
+    return compacted
+
+
+# ----------------------------------------------------------------------- READ
+# One committed manifest and everything derived from it. Replaced as a whole
+# by refresh(), so a read never mixes two versions of the store
+Snapshot = namedtuple('Snapshot',
+                      ['mtime', 'partitions', 'fixture_index', 'dataset'])
+
+
+def load_snapshot(root):
+    mtime = os.path.getmtime(os.path.join(root, MANIFEST))
+    partitions = read_manifest(root)['partitions']
+    files = [os.path.join(root, f)
+             for entry in partitions.values()
+             for f in entry['files']]
+    dataset = ds.dataset(files,
+                         format='parquet',
+                         partitioning=partitioning,
+                         partition_base_dir=root)
+    # Rival lists and match keys are lookups, not scans of the fixtures
+    return Snapshot(mtime, partitions, fixture_index(partitions), dataset)
+
+
+class EventStore:
+    """ Read-side handle over the partitioned event dataset, shared by every
+    session """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._snapshot = load_snapshot(root)
+
+    def refresh(self):
+        """ Pick up segments committed since the store was opened """
+        with self._lock:
+            mtime = os.path.getmtime(os.path.join(self.root, MANIFEST))
+            if mtime == self._snapshot.mtime:
+                return False
+
+            self._snapshot = load_snapshot(self.root)
+            return True
+
+    def teams(self):
+        return list(self._snapshot.fixture_index)
+
+    def rivals(self, team):
+        """ Opponents of a team, derived from its match partitions """
+        return list(self._snapshot.fixture_index.get(team, {}))
+
+    def matches(self, team, rivals):
+        """ Stored matches of a team against any of the rivals """
+        return self._matches(self._snapshot, team, rivals)
+
+    @staticmethod
+    def _matches(snapshot, team, rivals):
+        by_opponent = snapshot.fixture_index.get(team, {})
+        return [match for r in rivals for match in by_opponent.get(r, [])]
+
+    def version(self, team, matches=None):
+        """ Segments of the team's partitions, optionally only some matches.
+
+        Changes only when one of those partitions gets new events, so it can
+        be part of a cache key.
+        """
+        prefix = partition_key(team, '')
+        return tuple(
+            (key, entry['segments'][-1], len(entry['segments']))
+            for key, entry in sorted(self._snapshot.partitions.items())
+            if key.startswith(prefix)
+            and (matches is None or key[len(prefix):] in matches)
+        )
+
+    def events(self, team, columns=None):
+        """ Every event of a team """
+        return self.read(ds.field('team') == team, columns=columns)
+
+    def players(self, team):
+        df = self.read(ds.field('team') == team, columns=['player'])
+        return df['player'].dropna().sort_values().unique()
+
+    def query(self, team, rivals, event_type=None, columns=None):
+        """ Events of a team in its matches against any of the rivals """
+        # Match keys and files from the same snapshot
+        snapshot = self._snapshot
+        expr = (ds.field('team') == team) \
+            & ds.field('match').isin(self._matches(snapshot, team, rivals))
+        if event_type is not None:
+            expr = expr & (ds.field('type') == event_type)
+
+        return self.read(expr, columns=columns, snapshot=snapshot)
+
+    def read(self, expr, columns=None, snapshot=None):
+        snapshot = snapshot or self._snapshot
+        table = snapshot.dataset.to_table(filter=expr, columns=columns)
+        return table.to_pandas()
+
+
+def open_store(csv_path, root):
+    """ Open the event store, building it from the CSV export if missing or
+    written with an older layout """
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path) or read_manifest(root).get('layout') != LAYOUT:
+        build_store(csv_path, root)
+
+    return EventStore(root)
+
+
+if __name__ == '__main__':
+    command, args = sys.argv[1], sys.argv[2:]
+    if command == 'build':
+        print(build_store(*args))
+    elif command == 'ingest':
+        print('\n'.join(ingest(*args)))
+    elif command == 'reingest':
+        print('\n'.join(ingest(*args, replace=True)))
+    elif command == 'compact':
+        print('\n'.join(compact(*args)))
+    else:
+        sys.exit(f'Unknown command: {command}')
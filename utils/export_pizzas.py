@@ -0,0 +1,194 @@
+"""
+Batch export of pizza charts for a squad or a whole league.
+
+Uses the same percentile ranking and PyPizza setup as the Pizza Charts page.
+Percentile tables are computed once in the parent process and handed to every
+worker when it starts, so each task is a single row lookup plus the drawing.
+Writes one file per player and format, plus an index.csv listing them:
+
+    exports/pizzas/Manchester City/Erling Haaland-1234.png
+
+From the command line:
+    python -m utils.export_pizzas --team "Manchester City"
+    python -m utils.export_pizzas --league "ENG-Premier League" --season 2223 \
+        --cohort position --format png svg --workers 8
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.fonts import font
+from utils.metrics import per90_table, registry
+from utils.percentiles import MIN_90S, POSITIONS, cohort_index, \
+    percentile_table
+from utils.figures import available_cpus, render
+from utils.pizza import DEFAULT_STATS, pizza_figure, pizza_subtitle
+from utils.store import list_slices, load_table
+
+OUT_DIR = 'exports/pizzas'
+FORMATS = ['png', 'svg']
+
+# Set in every worker by _init_worker
+_shared = {}
+
+
+# ---------------------------------------------------------------------- SETUP
+def primary_position(pos):
+    """ First known position of a 'MF,FW' style value, or None """
+    for p in str(pos).split(','):
+        if p in POSITIONS:
+            return p
+    return None
+
+
+def file_name(text):
+    return re.sub(r'[\\/:*?"<>|]+', '_', str(text)).strip()
+
+
+def build_tasks(df, teams=None, cohort='all', min_90s=0):
+    """ One (row label, player id, player, team, cohort, stem) per chart """
+    rows = df
+    if teams:
+        rows = rows[rows['team'].isin(teams)]
+    rows = rows[rows['90s'] >= min_90s]
+
+    tasks = []
+    for label, pid, player, team, pos in zip(rows.index,
+                                             rows['player_id'],
+                                             rows['player'],
+                                             rows['team'],
+                                             rows['pos']):
+        group = primary_position(pos) if cohort == 'position' else None
+        stem = os.path.join(file_name(team), f'{file_name(player)}-{pid}')
+        tasks.append((label, int(pid), player, team, group, stem))
+
+    return tasks
+
+
+def percentile_tables(df, stats, cohorts, min_90s=MIN_90S):
+    """ Percentiles of the exported metrics against all players (None) and
+    each requested position group """
+    per90 = per90_table(df)
+    metrics = registry(df)
+    metrics = {m: metrics[m] for m in stats}
+    index = cohort_index(df)
+
+    return {c: percentile_table(df, per90, metrics, min_90s,
+                                None if c is None else index[c])
+            for c in cohorts}
+
+
+# --------------------------------------------------------------------- WORKER
+def _init_worker(tables, groups, league, season, formats, out_dir):
+    _shared.update(tables=tables, groups=groups, league=league,
+                   season=season, formats=formats, out_dir=out_dir)
+
+
+def render_task(task):
+    """ Draw one chart and write it in every format. Returns the paths """
+    label, pid, player, team, cohort, stem = task
+    table = _shared['tables'][cohort]
+    stats = [m for group in _shared['groups'] for m in group]
+
+    if label in table.index:
+        values = table.loc[label, stats].tolist()
+    else:  # Not in its position group
+        values = [np.nan] * len(stats)
+
+    images = render(pizza_figure,
+                    _shared['groups'],
+                    values,
+                    f'{player} - {team}',
+                    pizza_subtitle(_shared['league'],
+                                   _shared['season'],
+                                   cohort),
+                    font=font('bold'),
+                    format=_shared['formats'])
+
+    paths = []
+    for fmt, image in zip(_shared['formats'], images):
+        path = os.path.join(_shared['out_dir'], f'{stem}.{fmt}')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(image)
+        paths.append(path)
+
+    return paths
+
+
+# ----------------------------------------------------------------------- MAIN
+def export(league, season, teams=None, cohort='all', min_90s=MIN_90S,
+           formats=('png',), groups=DEFAULT_STATS, out_dir=OUT_DIR,
+           workers=None):
+    """ Render the charts and write index.csv. Returns the index """
+    df = load_table(league, season)
+    stats = [m for group in groups for m in group]
+
+    # Only players who are ranked at all get a chart
+    tasks = build_tasks(df, teams, cohort, min_90s)
+    cohorts = {t[4] for t in tasks}
+    tables = percentile_tables(df, stats, cohorts, min_90s)
+
+    workers = workers or available_cpus()
+    chunksize = max(1, len(tasks) // (4 * workers))
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(tables, groups, league, season,
+                                       list(formats), out_dir)) as pool:
+        files = list(pool.map(render_task, tasks, chunksize=chunksize))
+
+    index = pd.DataFrame({
+        'player_id': [t[1] for t in tasks],
+        'player': [t[2] for t in tasks],
+        'team': [t[3] for t in tasks],
+        'cohort': [t[4] or 'all' for t in tasks],
+    })
+    for i, fmt in enumerate(formats):
+        index[fmt] = [os.path.relpath(f[i], out_dir) for f in files]
+
+    os.makedirs(out_dir, exist_ok=True)
+    index.to_csv(os.path.join(out_dir, 'index.csv'), index=False)
+
+    return index
+
+
+def main():
+    slices = list_slices()
+    league, season = slices[0]
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--league', default=league)
+    parser.add_argument('--season', type=int, default=season)
+    parser.add_argument('--team', action='append', dest='teams',
+                        help='Export one squad. Repeat for several')
+    parser.add_argument('--cohort', choices=['all', 'position'],
+                        default='all',
+                        help='Rank against all players or the player\'s '
+                             'position group')
+    parser.add_argument('--min-90s', type=float, default=MIN_90S)
+    parser.add_argument('--format', nargs='+', choices=FORMATS,
+                        default=['png'], dest='formats')
+    parser.add_argument('--out', default=OUT_DIR)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes, by default one per available CPU')
+    args = parser.parse_args()
+
+    if (args.league, args.season) not in slices:
+        parser.error(f'No data for {args.league} {args.season}')
+
+    start = time.perf_counter()
+    index = export(args.league, args.season, args.teams, args.cohort,
+                   args.min_90s, args.formats, out_dir=args.out,
+                   workers=args.workers)
+    print(f'{len(index)} charts in {time.perf_counter() - start:.1f}s '
+          f'-> {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Figure lifecycle for every matplotlib page.
+
+Figures are only ever drawn through render(): the drawing function returns a
+figure, it is encoded to image bytes and closed before render() returns, even
+if encoding fails. Nothing stays in pyplot's figure registry between reruns.
+
+Each figure is charged its Agg canvas size (width x height x dpi^2 x 4 bytes)
+before it is encoded, which is when the canvas is allocated. Once the figures
+being encoded use FIGURE_BUDGET bytes, the next one waits for memory to be
+released instead of piling up. The module level budget covers this process;
+render workers swap it for one kept by their RenderService, so the budget
+holds across the whole pool. FigureBudget.stats() reports what is live.
+
+matplotlib is imported on first use, so the server process can share
+FigureBudget without loading it.
+"""
+import io
+import os
+import threading
+
+import numpy as np
+
+from utils.lazy import lazy_import
+
+plt = lazy_import('matplotlib.pyplot')
+transforms = lazy_import('matplotlib.transforms')
+
+# Canvas memory of the figures being encoded at the same time
+FIGURE_BUDGET = 512 * 2 ** 20
+
+# Same defaults as st.pyplot
+DPI = 200
+
+
+def available_cpus():
+    """ CPUs this process may run on, which os.cpu_count() ignores. Falls
+    back to os.cpu_count() where os.sched_getaffinity() is missing (macOS,
+    Windows). Sizes the pools that draw figures """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class FigureBudget:
+    """ Canvas bytes of the figures being encoded, at most limit at a time.
+    A figure larger than the whole budget still goes through, on its own """
+
+    def __init__(self, limit=FIGURE_BUDGET):
+        self.limit = limit
+        self._cond = threading.Condition()
+        self._live = {}  # key -> canvas bytes
+
+    def acquire(self, key, nbytes):
+        # Checked and charged under one lock, so two figures can not both
+        # take the last of the budget
+        with self._cond:
+            while self._live and \
+                    sum(self._live.values()) + nbytes > self.limit:
+                self._cond.wait()
+            self._live[key] = nbytes
+
+    def release(self, key):
+        with self._cond:
+            if self._live.pop(key, None) is not None:
+                self._cond.notify_all()
+
+    def stats(self):
+        """ Figures being encoded and their canvas bytes """
+        with self._cond:
+            return {'figures': len(self._live),
+                    'bytes': sum(self._live.values()),
+                    'budget': self.limit}
+
+
+# What render() charges figures to, replaced in render workers
+budget = FigureBudget()
+
+
+def canvas_bytes(fig, dpi=DPI):
+    """ Size of the RGBA buffer Agg allocates to draw fig at dpi """
+    w, h = fig.get_size_inches() * dpi
+    return int(w * h * 4)
+
+
+def close(fig):
+    """ Close a figure and release its share of the budget """
+    plt.close(fig)
+    budget.release(id(fig))
+
+
+def tight_bbox(fig, dpi=DPI):
+    """ bbox_inches='tight' area, in inches, grown to whole pixels of the
+    uncropped canvas. Cropping then moves the drawing by whole pixels, so text
+    and lines land on the same pixels as on the uncropped canvas (see
+    utils.pitches) """
+    fig.set_dpi(dpi)
+    box = fig.get_tightbbox(fig.canvas.get_renderer()) \
+        .padded(plt.rcParams['savefig.pad_inches'])
+    return transforms.Bbox([np.floor(box.p0 * dpi) / dpi,
+                           np.ceil(box.p1 * dpi) / dpi])
+
+
+def encode(fig, format='png', dpi=DPI):
+    buf = io.BytesIO()
+    fig.savefig(buf, format=format, dpi=dpi, bbox_inches=tight_bbox(fig, dpi))
+    return buf.getvalue()
+
+
+def render(draw, *args, format='png', dpi=DPI, **kwargs):
+    """ Image bytes of the figure returned by draw(*args, **kwargs).
+
+    format may be a list, in which case one image per format is returned
+    and the figure is only drawn once.
+    """
+    fig = draw(*args, **kwargs)
+    try:
+        budget.acquire(id(fig), canvas_bytes(fig, dpi))
+        if isinstance(format, str):
+            return encode(fig, format, dpi)
+        return [encode(fig, fmt, dpi) for fmt in format]
+    finally:
+        close(fig)
+
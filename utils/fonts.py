@@ -0,0 +1,33 @@
+"""
+Fonts bundled with the app (fonts/), loaded once per process.
+
+Pages used to download Roboto and Roboto Slab from GitHub with mplsoccer's
+FontManager every time they were imported. The files now ship with the repo
+and each FontProperties is built the first time it is asked for and then
+reused.
+"""
+import os
+from functools import lru_cache
+
+from utils.lazy import lazy_import
+
+font_manager = lazy_import('matplotlib.font_manager')
+
+FONT_DIR = 'fonts'
+
+FONTS = {
+    'normal': 'Roboto-Regular.ttf',
+    'italic': 'Roboto-Italic.ttf',
+    # Chart titles and the pizza legend, whose swatches are placed for it
+    'bold': 'RobotoSlab-Bold.ttf',
+}
+
+
+@lru_cache(maxsize=None)
+def font(name):
+    """ FontProperties of a bundled font: 'normal', 'italic' or 'bold' """
+    path = os.path.join(FONT_DIR, FONTS[name])
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'Font file missing: {path}')
+
+    return font_manager.FontProperties(fname=path)
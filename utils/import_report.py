@@ -0,0 +1,106 @@
+"""
+Import time of every page on a fresh worker.
+
+Runs the module level imports of each page in a new interpreter with
+python -X importtime and adds up the time spent per top level package
+(streamlit, pandas, matplotlib...). Imports done later, by lazy_import() or
+inside functions, are not counted: they are paid when a view first needs
+them, not on the first request.
+
+From the command line:
+    python -m utils.import_report
+    python -m utils.import_report pages/4_Chalkboard.py --top 15 --runs 5
+"""
+import argparse
+import ast
+import glob
+import subprocess
+import sys
+
+PAGES = ['Homepage.py'] + sorted(glob.glob('pages/*.py'))
+
+# Packages smaller than this are summed up as 'other'
+MIN_MS = 5
+
+
+def page_imports(path):
+    """ Source of the module level import statements of a page """
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+
+    return '\n'.join(ast.unparse(node) for node in tree.body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def parse_importtime(stderr):
+    """ Self time in ms per top level package, from -X importtime output """
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():  # Header
+            continue
+
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1000
+
+    return packages
+
+
+def profile(path, runs=3):
+    """ Import cost of a page: total ms and ms per package, the fastest of
+    runs fresh interpreters """
+    code = f'import time\n' \
+           f'start = time.perf_counter()\n' \
+           f'{page_imports(path)}\n' \
+           f'print((time.perf_counter() - start) * 1000)'
+
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime',
+                                 '-c', code],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f'{path}: {result.stderr.splitlines()[-1]}')
+
+        total = float(result.stdout.strip().splitlines()[-1])
+        if best is None or total < best[0]:
+            best = (total, parse_importtime(result.stderr))
+
+    return best
+
+
+def report(paths=PAGES, top=10, runs=3):
+    lines = []
+    for path in paths:
+        total, packages = profile(path, runs)
+
+        ranked = sorted(packages.items(), key=lambda p: p[1], reverse=True)
+        shown = [(p, ms) for p, ms in ranked[:top] if ms >= MIN_MS]
+        other = sum(packages.values()) - sum(ms for _, ms in shown)
+
+        lines.append(f'{path}: {total:.0f} ms')
+        for package, ms in shown + [('other', other)]:
+            lines.append(f'    {package:<24}{ms:>8.0f} ms'
+                         f'{100 * ms / total:>6.0f}%')
+        lines.append('')
+
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('pages', nargs='*', default=PAGES)
+    parser.add_argument('--top', type=int, default=10,
+                        help='Packages listed per page')
+    parser.add_argument('--runs', type=int, default=3,
+                        help='Fresh interpreters per page, the fastest is '
+                             'reported')
+    args = parser.parse_args()
+
+    print(report(args.pages, args.top, args.runs))
+
+
+if __name__ == '__main__':
+    main()
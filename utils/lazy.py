@@ -0,0 +1,49 @@
+"""
+Deferred imports, so a page only loads the libraries its current view uses.
+
+The drawing modules (utils.chalkboard, utils.pizza) are imported by pages for
+their constants, small helpers and the drawing functions they hand to the
+render workers, but the figures themselves are drawn in the workers. Their
+matplotlib and mplsoccer imports go through lazy_import(), and the page
+process never pays for them. See python -m utils.import_report for what each
+page imports.
+
+    mplsoccer = lazy_import('mplsoccer')
+    pitch = mplsoccer.Pitch(...)  # mplsoccer is imported here, once
+
+A name used by a class statement or at module level is needed right away
+and must stay a regular import.
+"""
+import importlib
+
+
+class LazyModule:
+    """ Stand-in for a module, imported on first attribute access """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        # Only called for names not set in __init__
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def call(target, *args, **kwargs):
+    """ Call target, a 'module:function' string, importing the module first.
+
+    Lets a process submit work to a pool by name without importing the
+    module itself; only the worker that runs it does.
+    """
+    module, function = target.split(':')
+    return getattr(importlib.import_module(module), function)(*args, **kwargs)
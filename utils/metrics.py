@@ -0,0 +1,58 @@
+"""
+Metric registry for the fbref stat columns.
+
+Every stat is either a count, which is normalised to per 90 minutes, or a
+rate (percentages, per 90 and per shot values, averages), which is used as
+is. Metrics also record whether a higher value is better, so rankings can be
+flipped for things like errors or fouls.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from utils.store import stat_columns
+
+Metric = namedtuple('Metric', ['name', 'rate', 'higher_is_better'])
+
+# Already normalised values. Dividing these by 90s is meaningless.
+RATE_METRICS = {
+    'SoT%', 'Sh/90', 'SoT/90', 'G/Sh', 'G/SoT', 'AvgShotDistance', 'npxG/Sh',
+    'TotCmp%', 'ShortPassCmp%', 'MedPassCmp%', 'LongPassCmp%',
+    'SCA90', 'GCA90', 'DrbTkl%', 'DrbSucc%', 'TimesTackled%', 'AerialWin%',
+}
+
+LOWER_IS_BETTER = {
+    'AvgShotDistance', 'PassesOffside', 'PassesBlocked', 'DrbPast', 'Err',
+    'TimesTackled', 'TimesTackled%', 'CarryMistakes', 'Disposesed',
+    'Yellows', 'Reds', 'Yellow2', 'Fouls', 'Offside', 'PKcon', 'OG',
+    'AerialLoss',
+}
+
+
+def metric(name):
+    return Metric(name,
+                  rate=name in RATE_METRICS,
+                  higher_is_better=name not in LOWER_IS_BETTER)
+
+
+def registry(df):
+    """ Metric for every stat column of a season table, in column order """
+    return {name: metric(name) for name in stat_columns(df)}
+
+
+def per90_table(df):
+    """ All stat columns with counts normalised per 90 minutes.
+
+    Rates are copied as they are. Players without minutes get NaN instead
+    of inf.
+    """
+    metrics = registry(df)
+    counts = [m.name for m in metrics.values() if not m.rate]
+
+    table = df[list(metrics)].astype('float32')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # In float32 like the stats, so the table stays half the size
+        table[counts] = table[counts].div(df['90s'].astype('float32'),
+                                          axis=0)
+
+    return table.replace([np.inf, -np.inf], np.nan)
@@ -0,0 +1,59 @@
+"""
+Percentile ranks of every player for every metric, computed in one pass.
+
+Players with a 0 in a stat, or with fewer than min_90s played, are left out
+of that stat's ranking and get NaN.
+
+Ranks can be restricted to a position cohort. Players listed with several
+positions ('MF,FW') belong to every one of them, and cohort membership is
+indexed once per dataset so switching cohorts never rescans the table.
+"""
+import numpy as np
+
+# Filter out players with less than 450 mins
+MIN_90S = 5
+
+POSITIONS = ['GK', 'DF', 'MF', 'FW']
+POSITION_NAMES = {
+    'GK': 'Goalkeepers',
+    'DF': 'Defenders',
+    'MF': 'Midfielders',
+    'FW': 'Forwards',
+}
+
+
+def cohort_index(df):
+    """ Row positions of the players in each position group """
+    # One entry per distinct 'pos' value ('MF', 'MF,FW', ...), not per player
+    groups = df.groupby('pos', observed=True).indices
+
+    index = {}
+    for pos in POSITIONS:
+        rows = [r for value, r in groups.items() if pos in value.split(',')]
+        index[pos] = np.sort(np.concatenate(rows)) if rows \
+            else np.array([], dtype=int)
+
+    return index
+
+
+def percentile_table(df, per90, metrics, min_90s=MIN_90S, rows=None):
+    """ Player x metric table of percentile ranks from 0 to 100
+
+    rows restricts the ranking to a cohort, given as row positions.
+    """
+    names = list(metrics)
+    if rows is not None:
+        df = df.iloc[rows]
+        per90 = per90.iloc[rows]
+
+    # Eliminate zeros on the raw stat and players below the minutes threshold
+    ranked = df[names].ne(0) & (df['90s'] >= min_90s).to_numpy()[:, None]
+    values = per90[names].where(ranked)
+
+    higher = [m for m in names if metrics[m].higher_is_better]
+    lower = [m for m in names if not metrics[m].higher_is_better]
+
+    ranks = values[higher].rank(pct=True)
+    ranks = ranks.join(values[lower].rank(pct=True, ascending=False))
+
+    return (ranks[names] * 100).round(2)
@@ -0,0 +1,99 @@
+"""
+Static pitch backgrounds for the Chalkboard figures.
+
+Pitch lines, goal boxes, thirds, the direction arrow, margins and the team
+logo are identical on every rerun of a layout. A PitchTemplate draws them once,
+keeps the result as an RGBA raster plus the position and data limits of every
+axes, and hands out new figures with that raster as background and empty,
+transparent axes in the same places. Only the event layers (passes, titles,
+legends) are drawn per request.
+
+The raster matches the render resolution, so templates are built for the dpi
+the figures are encoded at. utils.figures.encode() crops on whole pixels,
+which keeps the raster on the same pixels as a figure drawn from scratch.
+"""
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.artist import Artist
+from matplotlib.patches import Rectangle
+
+from utils.figures import DPI, close
+
+
+class Background(Artist):
+    """ RGBA raster copied onto the canvas pixel for pixel, no resampling.
+
+    Anchored to the figure origin, so it follows bbox_inches='tight' crops,
+    and kept out of the tight bbox itself.
+    """
+    zorder = -1
+
+    def __init__(self, rgba):
+        super().__init__()
+        # draw_image expects the bottom row first
+        self.rgba = np.ascontiguousarray(rgba[::-1])
+        self.set_in_layout(False)
+
+    def draw(self, renderer):
+        x, y = self.figure.transFigure.transform((0, 0))
+        gc = renderer.new_gc()
+        renderer.draw_image(gc, round(x), round(y), self.rgba)
+        gc.restore()
+
+
+class PitchTemplate:
+
+    def __init__(self, pitch, fig, axs, dpi=DPI):
+        """ pitch, fig and axs as returned by the static drawing, i.e. the
+        pitch and pitch.grid(...) output. The figure is closed """
+        self.pitch = pitch
+        self.dpi = dpi
+        self.size = fig.get_size_inches()
+        # Shows where bbox_inches='tight' reaches past the raster
+        self.facecolor = fig.get_facecolor()
+
+        fig.set_dpi(dpi)
+        fig.canvas.draw()
+        renderer = fig.canvas.get_renderer()
+        self.background = np.asarray(fig.canvas.buffer_rgba()).copy()
+
+        # Area covered by the static artists, in figure fractions. Keeps
+        # bbox_inches='tight' cropping the same as on the full drawing
+        box = fig.get_tightbbox(renderer)
+        w, h = self.size
+        self.extent = (box.x0 / w, box.y0 / h, box.width / w, box.height / h)
+
+        # name -> [(position, xlim, ylim)], and whether it is an array
+        self.axes = {}
+        for name, axes in axs.items():
+            self.axes[name] = ([(ax.get_position().bounds,
+                                 ax.get_xlim(),
+                                 ax.get_ylim()) for ax in np.ravel(axes)],
+                               isinstance(axes, np.ndarray))
+
+        close(fig)
+
+    def figure(self):
+        """ New figure with the static layer drawn. Returns fig and axs like
+        pitch.grid """
+        fig = plt.figure(figsize=self.size, dpi=self.dpi,
+                         facecolor=self.facecolor)
+
+        fig.add_artist(Background(self.background))
+
+        fig.add_artist(Rectangle(self.extent[:2], *self.extent[2:],
+                                 transform=fig.transFigure, alpha=0,
+                                 linewidth=0))
+
+        axs = {}
+        for name, (geometry, is_array) in self.axes.items():
+            axes = []
+            for position, xlim, ylim in geometry:
+                ax = fig.add_axes(position)
+                ax.set_xlim(xlim)
+                ax.set_ylim(ylim)
+                ax.axis('off')
+                axes.append(ax)
+            axs[name] = np.array(axes) if is_array else axes[0]
+
+        return fig, axs
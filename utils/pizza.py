@@ -0,0 +1,186 @@
+"""
+Pizza chart drawing, shared by the Pizza Charts page and batch exports.
+
+Metrics come in four groups (defence, possession, playmaking, attack), each
+with its own slice colour. Draw through utils.figures.render so the figure is
+encoded and closed right away. matplotlib and mplsoccer are only imported
+once a chart is drawn.
+"""
+import numpy as np
+
+from utils import fonts
+from utils.lazy import lazy_import
+from utils.percentiles import POSITION_NAMES
+from utils.store import league_name, season_name
+
+mplsoccer = lazy_import('mplsoccer')
+plt = lazy_import('matplotlib.pyplot')
+
+green = '#2ba02b'
+red = '#d70232'
+yellow = '#ff9300'
+blue = '#1a78cf'
+
+# Slice colour of each metric group, in chart order
+GROUP_COLORS = ['#1A78CF', '#FF9300', green, '#D70232']
+
+# Metrics shown by default: defence, possession, playmaking and attack
+DEFAULT_STATS = (
+    ('Tkl+Int', 'TklWinPoss', 'DrbTkl%', 'AerialWin%', 'Clr'),
+    ('PassesAttempted', 'TotCmp%', 'LiveTouch', 'ProgCarries', 'Switches'),
+    ('CarriesToFinalThird', 'ProgPasses', 'SuccDrb', 'KeyPasses', 'SCA90'),
+    ('npxG', 'Shots', 'SoT%', 'npG-xG', 'ProgPassesRec'),
+)
+
+CREDIT_1 = 'Data: Opta via fbref'
+CREDIT_3 = 'Daniel Granja C.'
+CREDIT_4 = '@DGCFutbol'
+
+
+def map_stat_labels(labels_list):
+    map_labels = {'Tackles\nplus\nInterceptions': 'Tackles +\nInterceptions',
+                  'Percent\nof\nChallenge\nSuccess': 'Succ. Challenge %'}
+
+    for i, label in enumerate(labels_list):
+        if label in map_labels.keys():
+            labels_list[i] = map_labels[label]
+
+    return labels_list
+
+
+def pizza_labels(stats):
+    """ Slice labels for a flat list of metric names """
+    return map_stat_labels([x.replace('_', '\n') for x in stats])
+
+
+def pizza_figure(groups, values, title, subtitle, font=None):
+    """ Draw a pizza chart.
+
+    groups are the four metric lists (defence, possession, playmaking,
+    attack) and values their percentiles, flattened in the same order.
+    Missing percentiles (NaN) are drawn as 0. font is the FontProperties of
+    the title, subtitle and legend, bundled Roboto Slab Bold by default.
+    """
+    if font is None:
+        font = fonts.font('bold')
+    stats = [m for group in groups for m in group]
+    values = [0 if np.isnan(v) else v for v in values]
+
+    n_def, n_poss, n_pmk, n_atk = [len(group) for group in groups]
+    # color for the slices and text
+    slice_colors = [c for c, group in zip(GROUP_COLORS, groups)
+                    for _ in group]
+    text_colors = ["#000000"] * (n_def + n_poss + n_pmk) + ["#F2F2F2"] * n_atk
+
+    baker = mplsoccer.PyPizza(
+        params=pizza_labels(stats),
+        background_color="#222222",  # background color
+        straight_line_color="#000000",  # color for straight lines
+        straight_line_lw=1,
+        last_circle_lw=1,  # linewidth of last circle
+        other_circle_lw=0,  # linewidth for other circles
+        inner_circle_size=20  # size of inner circle
+    )
+
+    fig, ax = baker.make_pizza(
+        values=values,
+        figsize=(8, 8.5),  # adjust the figsize according to your need
+        color_blank_space="same",  # use the same color to fill blank space
+        slice_colors=slice_colors,  # color for individual slices
+        value_colors=text_colors,  # color for the value-text
+        value_bck_colors=slice_colors,  # color for the blank spaces
+        blank_alpha=0.4,  # alpha for blank-space colors
+        kwargs_slices=dict(
+            edgecolor="#000000", zorder=2, linewidth=1
+        ),  # values to be used when plotting slices
+        kwargs_params=dict(
+            color="#F2F2F2", fontsize=11,
+            va='center',
+            wrap=True
+        ),  # values to be used when adding parameter labels
+        kwargs_values=dict(
+            color="#F2F2F2", fontsize=11,
+            zorder=3,
+            bbox=dict(
+                edgecolor="#000000", facecolor="cornflowerblue",
+                boxstyle="round,pad=0.2", lw=1
+            )
+        )  # values to be used when adding parameter-values labels
+    )
+
+    # ----------------------------- TEXT ELEMENTS
+    # Add credits
+    fig.text(
+        0.01, 0.02, f"{CREDIT_1}", size=9,
+        color="#F2F2F2",
+        ha="left"
+    )
+
+    fig.text(
+        0.99, 0.02, f"{CREDIT_3}\n{CREDIT_4}",
+        size=12,
+        color="#F2F2F2",
+        ha="right"
+    )
+
+    # Add margin
+    fig.text(
+        1, 0, "o", alpha=0
+    )
+
+    # Add title
+    fig.text(
+        0.515, 0.975, title, size=16,
+        ha="center", fontproperties=font, color="#F2F2F2"
+    )
+
+    # add subtitle
+    fig.text(
+        0.515, 0.9475, subtitle,
+        size=13,
+        ha="center", fontproperties=font, color="#F2F2F2"
+    )
+
+    leg_h = 0.915
+    y_diff = 0.003
+
+    # add text
+    fig.text(
+        0.2, leg_h, "Ataque"
+                    + "         "
+                    + "Creación de Juego"
+                    + "          "
+                    + "Posesión"
+                    + "          "
+                    + "Defensa",
+        size=14,
+        fontproperties=font, color="#F2F2F2"
+    )
+
+    # add rectangles
+    fig.patches.extend([
+        plt.Rectangle(
+            (0.17, leg_h-y_diff), 0.025, 0.021, fill=True, color=red,
+            transform=fig.transFigure, figure=fig
+        ),
+        plt.Rectangle(
+            (0.305, leg_h-y_diff), 0.025, 0.021, fill=True, color=green,
+            transform=fig.transFigure, figure=fig
+        ),
+        plt.Rectangle(
+            (0.572, leg_h-y_diff), 0.025, 0.021, fill=True, color=yellow,
+            transform=fig.transFigure, figure=fig
+        ),
+        plt.Rectangle(
+            (0.734, leg_h-y_diff), 0.025, 0.021, fill=True, color=blue,
+            transform=fig.transFigure, figure=fig
+        ),
+    ])
+
+    return fig
+
+
+def pizza_subtitle(league, season, cohort=None):
+    cohort_name = 'Players' if cohort is None else POSITION_NAMES[cohort]
+    return f"Percentile Rank vs {league_name(league)} {cohort_name} " \
+           f"| Season {season_name(season)}"
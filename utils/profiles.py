@@ -0,0 +1,63 @@
+"""
+Player profile lookups by stable player id.
+
+The index maps every player id to its rows (one per team the player appeared
+for in the season) and every team to its players, so a profile costs one
+dict lookup plus one positional read per requested metric, whatever the size
+of the dataset.
+"""
+from collections import namedtuple
+
+Profile = namedtuple('Profile',
+                     ['player_id', 'player', 'team', 'values', 'percentiles'])
+
+
+class PlayerIndex:
+
+    def __init__(self, df):
+        self.df = df
+        self.names = {}
+        self.rows = {}  # player id -> [(team, row position)]
+        self.teams = {}  # team -> [player id]
+
+        for pos, (pid, name, team) in enumerate(
+                zip(df['player_id'], df['player'], df['team'])):
+            self.names[pid] = name
+            self.rows.setdefault(pid, []).append((team, pos))
+            self.teams.setdefault(team, []).append(pid)
+
+    def team_players(self, team):
+        """ Player ids of a team, in table order """
+        return self.teams.get(team, [])
+
+    def row(self, player_id, team=None):
+        """ Row position of a player. With team, the row for that team """
+        rows = self.rows[player_id]
+        if team is None:
+            return rows[0][1]
+
+        for row_team, pos in rows:
+            if row_team == team:
+                return pos
+        raise KeyError(f'Player {player_id} has no row for {team}')
+
+    def profile(self, player_id, metrics, per90, percentiles, team=None):
+        """ p90 values and percentiles of a player for the given metrics.
+
+        percentiles may be a cohort table that does not contain the player;
+        the percentiles are then NaN.
+        """
+        pos = self.row(player_id, team)
+        team = self.df['team'].iat[pos]
+
+        values = [per90.iat[pos, per90.columns.get_loc(m)] for m in metrics]
+
+        label = self.df.index[pos]
+        if label in percentiles.index:
+            rank_pos = percentiles.index.get_loc(label)
+            ranks = [percentiles.iat[rank_pos, percentiles.columns.get_loc(m)]
+                     for m in metrics]
+        else:
+            ranks = [float('nan')] * len(metrics)
+
+        return Profile(player_id, self.names[player_id], team, values, ranks)
@@ -0,0 +1,75 @@
+"""
+Range-filtered rankings for the Homepage "Ranking de Rendimiento" table.
+
+For every position value the per-90 table is stored as one block with its
+rows sorted by 90s played. A 90s range is then two searchsorted calls per
+selected position, and only the players inside the range are ranked.
+"""
+import numpy as np
+import pandas as pd
+
+
+class RankingIndex:
+
+    def __init__(self, df, per90):
+        self.df = df
+        self.columns = {name: i for i, name in enumerate(per90.columns)}
+
+        nineties = df['90s'].to_numpy()
+        raw = df[list(per90.columns)].to_numpy(dtype='float32')
+        values = per90.to_numpy()
+
+        # pos value -> (90s sorted, row positions, raw stats, per 90 stats)
+        self.groups = {}
+        for pos, rows in df.groupby('pos', observed=True).indices.items():
+            order = rows[np.argsort(nineties[rows], kind='stable')]
+            self.groups[pos] = (nineties[order], order,
+                                raw[order], values[order])
+
+    def select(self, metric, positions, lo, hi):
+        """ Rows, raw and p90 values of a metric for players with lo <= 90s
+        <= hi in any of the positions """
+        col = self.columns[metric]
+        rows, raw, values = [], [], []
+
+        for pos in positions:
+            if pos not in self.groups:
+                continue
+            nineties, order, g_raw, g_values = self.groups[pos]
+            i = np.searchsorted(nineties, lo, side='left')
+            j = np.searchsorted(nineties, hi, side='right')
+            rows.append(order[i:j])
+            raw.append(g_raw[i:j, col])
+            values.append(g_values[i:j, col])
+
+        if not rows:
+            return np.array([], dtype=int), np.array([]), np.array([])
+
+        return np.concatenate(rows), np.concatenate(raw), \
+            np.concatenate(values)
+
+    def rank(self, metric, positions, lo, hi, higher_is_better=True,
+             top=None):
+        """ Ranking table of the selected players, best first """
+        rows, raw, values = self.select(metric, positions, lo, hi)
+
+        # Eliminate players with 0 on stat to be ranked, or without minutes
+        keep = (raw != 0) & ~np.isnan(values)
+        rows, values = rows[keep], values[keep]
+
+        ranks = pd.Series(values).rank(pct=True,
+                                       ascending=higher_is_better)
+        ranks = np.round(ranks.to_numpy() * 100, 1)
+
+        # Top k by rank without sorting the whole selection
+        if top is not None and top < len(ranks):
+            best = np.argpartition(-ranks, top - 1)[:top]
+        else:
+            best = np.arange(len(ranks))
+        best = best[np.argsort(-ranks[best], kind='stable')]
+
+        table = self.df.iloc[rows[best]][['player', 'team', '90s']]
+        table[metric] = values[best]
+        table['Rank'] = ranks[best]
+
+        return table.reset_index(drop=True)
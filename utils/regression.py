@@ -0,0 +1,125 @@
+"""
+Trend lines for the Scatter Plots page, in plain NumPy.
+
+The page used statsmodels for a single OLS fit, and importing statsmodels.api
+takes about a second and tens of MB per process, on every cold load, for a
+line most visitors never ask for. The fits here are closed form or a few
+vectorized iterations:
+
+    Linear                 least squares
+    Robust                 Huber M-estimate (iteratively reweighted least
+                           squares), less pulled by outliers
+    LOWESS                 locally weighted linear fits with tricube weights
+    LOWESS (statsmodels)   statsmodels' lowess, with its robustifying
+                           iterations. statsmodels is only imported for it
+
+trend_line() returns the curve to draw, evaluated on a grid over the x range.
+Rows where x or y is missing are left out of every fit.
+"""
+import numpy as np
+
+FITS = ['Linear', 'Robust', 'LOWESS', 'LOWESS (statsmodels)']
+
+# Points the curves are evaluated at. Straight lines only need the ends
+CURVE_POINTS = 50
+
+# Share of the points each local LOWESS fit uses
+LOWESS_FRAC = 2 / 3
+
+# Tuning constant of the Huber weights, 95% efficient for normal errors
+HUBER_C = 1.345
+
+
+def finite(x, y):
+    """ x and y as float arrays, without the rows where either is missing """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    return x[keep], y[keep]
+
+
+def ols(x, y, weights=None):
+    """ Intercept and slope of the (weighted) least squares line """
+    w = np.ones_like(x) if weights is None else weights
+    sw = w.sum()
+    x_mean = (w * x).sum() / sw
+    y_mean = (w * y).sum() / sw
+
+    sxx = (w * (x - x_mean) ** 2).sum()
+    slope = 0.0 if sxx == 0 else (w * (x - x_mean) * (y - y_mean)).sum() / sxx
+    return y_mean - slope * x_mean, slope
+
+
+def huber(x, y, c=HUBER_C, max_iter=50, tol=1e-8):
+    """ Intercept and slope of the Huber M-estimate line, by IRLS """
+    intercept, slope = ols(x, y)
+    for _ in range(max_iter):
+        resid = y - intercept - slope * x
+
+        # Scale from the median absolute deviation
+        scale = np.median(np.abs(resid - np.median(resid))) / 0.6745
+        if scale == 0:
+            break
+
+        u = np.abs(resid) / (c * scale)
+        weights = np.where(u <= 1, 1, 1 / np.maximum(u, 1))
+
+        new = ols(x, y, weights)
+        done = np.allclose(new, (intercept, slope), rtol=0, atol=tol)
+        intercept, slope = new
+        if done:
+            break
+
+    return intercept, slope
+
+
+def lowess(x, y, grid, frac=LOWESS_FRAC):
+    """ Local linear fit at each grid point, over the nearest frac of the
+    points with tricube weights """
+    k = min(len(x), max(2, int(np.ceil(frac * len(x)))))
+
+    # grid x points distance matrix, then the k-th nearest distance per row
+    dist = np.abs(grid[:, None] - x[None, :])
+    radius = np.partition(dist, k - 1, axis=1)[:, k - 1]
+    radius = np.where(radius > 0, radius, 1)[:, None]
+
+    w = np.clip(1 - (dist / radius) ** 3, 0, None) ** 3
+
+    sw = w.sum(axis=1)
+    x_mean = (w * x).sum(axis=1) / sw
+    y_mean = (w * y).sum(axis=1) / sw
+    dx = x[None, :] - x_mean[:, None]
+    sxx = (w * dx ** 2).sum(axis=1)
+    sxy = (w * dx * (y[None, :] - y_mean[:, None])).sum(axis=1)
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxx), where=sxx > 0)
+
+    return y_mean + slope * (grid - x_mean)
+
+
+def statsmodels_lowess(x, y, grid, frac=LOWESS_FRAC):
+    """ statsmodels' lowess (3 robustifying iterations) evaluated at grid """
+    # Imported here so statsmodels only loads when this fit is picked
+    from statsmodels.nonparametric.smoothers_lowess import lowess as sm_lowess
+
+    return sm_lowess(y, x, frac=frac, xvals=grid)
+
+
+def trend_line(x, y, method='Linear', points=CURVE_POINTS):
+    """ Trend of y against x with one of FITS. Returns the x and y of the
+    curve to draw, empty if there are fewer than two points """
+    x, y = finite(x, y)
+    if len(x) < 2:
+        return np.empty(0), np.empty(0)
+
+    if method in ('Linear', 'Robust'):
+        grid = np.array([x.min(), x.max()])
+        intercept, slope = (ols if method == 'Linear' else huber)(x, y)
+        return grid, intercept + slope * grid
+
+    grid = np.linspace(x.min(), x.max(), points)
+    if method == 'LOWESS':
+        return grid, lowess(x, y, grid)
+    if method == 'LOWESS (statsmodels)':
+        return grid, statsmodels_lowess(x, y, grid)
+
+    raise ValueError(f'Unknown fit: {method}')
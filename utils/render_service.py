@@ -0,0 +1,189 @@
+"""
+Process pool that draws matplotlib figures off the Streamlit script thread.
+
+Figures are drawn under the GIL, so sessions rendering at the same time used
+to queue behind each other on one core. Pages now submit a render spec, i.e.
+a module level drawing function plus plain data (numpy arrays, strings,
+colors), and get image bytes back from a worker process.
+
+Each worker is a separate python -m utils.render_worker process that
+connects back to the service, so it never inherits the Streamlit server
+state, and keeps its own font and pitch template caches. A dispatcher thread
+per worker feeds it renders from a shared queue and starts a new worker if
+it dies, or if a render runs past the timeout, so a hung drawing never keeps
+a worker busy. The number of renders queued or running is capped: past the
+cap, or past the timeout, the page gets a RenderError right away instead of
+piling more work on the pool. Workers reserve the canvas memory of each
+figure from the service before encoding it, so utils.figures.FIGURE_BUDGET
+holds for the pool as a whole. stats() reports the queue and the figures in
+flight, and show_stats() puts them in the sidebar.
+
+A single service per server process is shared by every session through
+get_render_service(). Work is submitted by name (utils.lazy.call), so the
+server process never imports matplotlib; only the workers do.
+"""
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from multiprocessing.connection import Listener
+
+import streamlit as st
+
+from utils.figures import FigureBudget, available_cpus
+
+# Seconds a page waits for an image
+RENDER_TIMEOUT = 30
+
+
+class RenderError(RuntimeError):
+    pass
+
+
+class RenderService:
+
+    def __init__(self, workers=None, max_pending=None,
+                 timeout=RENDER_TIMEOUT):
+        self.workers = workers or available_cpus()
+        self.max_pending = max_pending or 4 * self.workers
+        self.timeout = timeout
+
+        self.budget = FigureBudget()
+        # Workers prove they were started by this service when connecting
+        self._authkey = os.urandom(32)
+
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._jobs = queue.SimpleQueue()
+        self._closed = False
+        for _ in range(self.workers):
+            threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def render(self, draw, *args, format='png', **kwargs):
+        """ Image bytes of draw(*args, **kwargs), drawn in a worker by
+        utils.figures.render. A dpi keyword is passed on to it """
+        if not self._slots.acquire(blocking=False):
+            raise RenderError(f'{self.max_pending} renders already queued')
+        with self._lock:
+            self._pending += 1
+
+        # The slot is freed when the work is done, not when the caller gives
+        # up, so timed out renders still count against the queue
+        future = Future()
+        future.add_done_callback(self._done)
+        self._jobs.put((future, 'utils.figures:render', (draw,) + args,
+                        dict(kwargs, format=format)))
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise RenderError(f'Render took over {self.timeout}s')
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def stats(self):
+        """ Workers, renders queued or running, and the figures being
+        encoded across the pool with their canvas bytes """
+        with self._lock:
+            pending = self._pending
+        return dict(self.budget.stats(), workers=self.workers,
+                    pending=pending, max_pending=self.max_pending)
+
+    def _start_worker(self):
+        # A Unix socket, or a named pipe on Windows, that only this worker
+        # connects to. The key goes through stdin rather than the arguments
+        with Listener(authkey=self._authkey) as listener:
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'utils.render_worker',
+                 listener.address],
+                stdin=subprocess.PIPE)
+            process.stdin.write(self._authkey)
+            process.stdin.close()
+            return process, listener.accept()
+
+    def _dispatch(self):
+        """ Feed renders to one worker, replacing it when it dies """
+        process, conn = self._start_worker()
+        while not self._closed:
+            future, target, args, kwargs = self._jobs.get()
+            if future is None or not future.set_running_or_notify_cancel():
+                continue  # Shut down, or given up on before it started
+
+            try:
+                kind, value = self._run(conn, future, target, args, kwargs)
+            except (EOFError, OSError):  # The worker died
+                future.set_exception(
+                    RenderError('Render worker restarted, try again'))
+                process, conn = self._replace_worker(process, conn)
+                continue
+            except RenderError as e:  # The worker is stuck past the deadline
+                future.set_exception(e)
+                process, conn = self._replace_worker(process, conn)
+                continue
+            except Exception as e:  # Arguments or result that do not pickle
+                future.set_exception(e)
+                continue
+
+            if kind == 'result':
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+        conn.close()  # The worker exits once its connection closes
+        process.wait()
+
+    def _replace_worker(self, process, conn):
+        conn.close()
+        process.kill()
+        process.wait()
+        return self._start_worker()
+
+    def _run(self, conn, future, target, args, kwargs):
+        """ Send one render to a worker and answer its figure memory
+        requests until it replies, or the timeout passes """
+        deadline = time.monotonic() + self.timeout
+        try:
+            conn.send((target, args, kwargs))
+            while True:
+                if not conn.poll(max(deadline - time.monotonic(), 0)):
+                    raise RenderError(f'Render took over {self.timeout}s')
+                kind, value = conn.recv()
+                if kind != 'reserve':
+                    return kind, value
+                self.budget.acquire(future, value)
+                conn.send(True)
+        finally:
+            self.budget.release(future)
+
+    def shutdown(self):
+        self._closed = True
+        for _ in range(self.workers):
+            self._jobs.put((None, None, None, None))
+
+
+@st.cache_resource()
+def get_render_service():
+    return RenderService()
+
+
+def show_stats(container=st.sidebar):
+    """ Load of the render pool, for whoever runs the app: renders queued or
+    running and the figure memory in use """
+    stats = get_render_service().stats()
+    with container.expander('Estado de los gráficos'):
+        st.write(
+            f"Procesos: {stats['workers']}\n\n"
+            f"En cola o en curso: {stats['pending']} de "
+            f"{stats['max_pending']}\n\n"
+            f"Figuras en memoria: {stats['figures']} "
+            f"({stats['bytes'] / 2 ** 20:.0f} de "
+            f"{stats['budget'] / 2 ** 20:.0f} MB)"
+        )
@@ -0,0 +1,63 @@
+"""
+Render worker process, started by utils.render_service.RenderService.
+
+    python -m utils.render_worker <address>
+
+Connects to the service listening on address, with the key read from stdin.
+Reads calls from the connection, runs them one at a time and sends back
+their result or exception, until the service closes the connection. Figure
+memory is reserved from the service before each figure is encoded, so one
+budget covers the whole pool (see utils.figures).
+
+Workers are started as their own program rather than through multiprocessing,
+whose spawned children re-import the parent's __main__: under Streamlit that
+is the page that happened to be running.
+"""
+import sys
+from multiprocessing.connection import Client
+
+from utils import figures
+from utils.lazy import call
+
+
+class ServiceBudget:
+    """ Figure budget kept by the service. acquire() waits for its go-ahead,
+    and the service releases the memory once the render has returned """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def acquire(self, key, nbytes):
+        self.conn.send(('reserve', nbytes))
+        self.conn.recv()
+
+    def release(self, key):
+        pass
+
+
+def serve(conn):
+    while True:
+        try:
+            target, args, kwargs = conn.recv()
+        except EOFError:  # Service closed the connection
+            return
+
+        try:
+            reply = ('result', call(target, *args, **kwargs))
+        except Exception as e:
+            reply = ('error', e)
+
+        try:
+            conn.send(reply)
+        except Exception as e:  # Result or exception that does not pickle
+            conn.send(('error', RuntimeError(f'{target}: {e!r}')))
+
+
+def main():
+    conn = Client(sys.argv[1], authkey=sys.stdin.buffer.read())
+    figures.budget = ServiceBudget(conn)
+    serve(conn)
+
+
+if __name__ == '__main__':
+    main()
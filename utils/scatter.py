@@ -0,0 +1,278 @@
+"""
+Player scatter of the Scatter Plots page.
+
+All players are drawn by a single Scattergl trace. Highlighted teams and
+players are told apart by per point color, size and outline arrays rather
+than by one trace each, so the figure stays the same size whatever is
+selected and WebGL keeps it responsive with thousands of points. Legend
+entries for the highlighted teams are empty traces with the same marker.
+
+Colors are passed as integer codes into a discrete colorscale: plotly checks
+numeric arrays in one go, but validates color strings one point at a time.
+
+base_figure() draws everything that does not depend on the player tags: the
+points, the trend line (see utils.regression) or zone lines, and the
+credits. The page caches its spec and only patches the title and tag
+annotations in with_tags() when those are edited.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# ---------------------------------------------------------------- MAPPINGS
+# Marker fill and outline of each team
+team_colours = {
+    'Arsenal': ['#FFFFFF', '#EF0107'],  # 063672
+    'Aston Villa': ['#95BFE5', '#670E36'],
+    'Bournemouth': ['#DA291C', '#000000'],
+    'Brentford': ['#FFFFFF', '#e30613'],
+    'Brighton': ['#0057B8', '#FFCD00'],
+    'Burnley': ['#6C1D45', '#99D6EA'],
+    'Chelsea': ['#034694', '#034694'],
+    'Crystal Palace': ['#1B458F', '#A7A5A6'],
+    'Everton': ['#003399', '#FFFFFF'],
+    'Fulham': ['#000000', '#CC0000'],
+    'Leeds United': ['#FFCD00', '#1D428A'],
+    'Leicester City': ['#003090', '#FDBE11'],
+    'Liverpool': ['#ce1317', '#9a1310'],
+    'Manchester Utd': ['#000000', '#DA291C'],
+    'Manchester City': ['#6CABDD', '#6CABDD'],
+    'Newcastle Utd': ['#241F20', '#FFFFFF'],
+    'Norwhich City': ['#FFF200', '#00A650'],
+    'Nott\'ham Forest': ['#ff0000', '#ff0000'],
+    'Sheffield Utd': ['#EE2737', '#FFFFFF'],
+    'Southampton': ['#D71920', '#130C0E'],
+    'Tottenham': ['#132257', '#FFFFFF'],
+    'Watford': ['#FBEE23', '#ED2127'],
+    'West Ham': ['#7A263A', '#1BB1E7'],
+    'Wolves': ['#FDB913', '#231F20'],
+}
+# Teams from other leagues
+default_colours = ['white', 'red']
+
+# ------------------------------------------------------------ MARKER STYLES
+# Players not highlighted
+other_size = 10
+other_color = 'grey'
+other_line_color = '#0A0A0A'
+other_line_width = 1
+
+# Players of highlighted teams
+team_size = 12
+team_line_width = 2.5
+
+# Highlighted players, filled with the color picked for their tag
+player_size = 12
+player_line_color = 'red'
+player_line_width = 2.5
+
+paper_bg_color = '#050505'
+plot_bg_color = '#131313'
+
+trend_color = 'blue'
+zone_line_color = 'white'
+
+credits_color = '#358CFF'
+
+
+def team_colour(team):
+    return team_colours.get(team, default_colours)
+
+
+def marker_styles(df, teams=(), player_colors=None):
+    """ Per point marker arrays for the rows of df: color, size, line_color,
+    line_width, plus layer (0 others, 1 highlighted team, 2 highlighted
+    player) to draw highlighted points on top """
+    player_colors = player_colors or {}
+    fill = {team: team_colour(team)[0] for team in teams}
+    outline = {team: team_colour(team)[1] for team in teams}
+
+    in_team = df['team'].isin(fill).to_numpy()
+    in_player = df['player'].isin(player_colors).to_numpy()
+
+    color = df['team'].map(fill).fillna(other_color).to_numpy(copy=True)
+    line_color = df['team'].map(outline).fillna(other_line_color) \
+        .to_numpy(copy=True)
+    color[in_player] = df['player'][in_player].map(player_colors).to_numpy()
+    line_color[in_player] = player_line_color
+
+    size = np.select([in_player, in_team],
+                     [player_size, team_size], other_size)
+    line_width = np.select([in_player, in_team],
+                           [player_line_width, team_line_width],
+                           other_line_width)
+    layer = np.select([in_player, in_team], [2, 1], 0)
+
+    return {'color': color, 'size': size, 'line_color': line_color,
+            'line_width': line_width, 'layer': layer}
+
+
+def discrete_colors(colors):
+    """ Integer code of each color, and the colorscale and cmax that map the
+    codes back to the colors """
+    codes, uniques = pd.factorize(colors)
+    cmax = max(len(uniques) - 1, 1)
+    scale = [[i / cmax, c] for i, c in enumerate(uniques)]
+    if len(uniques) == 1:
+        scale.append([1, uniques[0]])
+    return codes, scale, cmax
+
+
+def scatter_figure(df, val_x, val_y, teams=(), player_colors=None):
+    """ Scatter of val_y against val_x, one point per row of df (with
+    'player' and 'team' columns). teams are highlighted with their colours
+    and player_colors maps highlighted players to their fill """
+    styles = marker_styles(df, teams, player_colors)
+
+    # Stable, so players keep their order within each layer
+    order = np.argsort(styles['layer'], kind='stable')
+    styles = {k: v[order] for k, v in styles.items()}
+
+    color, color_scale, color_max = discrete_colors(styles['color'])
+    line_color, line_scale, line_max = discrete_colors(styles['line_color'])
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Scattergl(
+        x=df[val_x].to_numpy()[order],
+        y=df[val_y].to_numpy()[order],
+        mode='markers',
+        customdata=np.stack([df['player'].to_numpy()[order],
+                             df['team'].to_numpy()[order]], axis=-1),
+        hovertemplate='<b>%{customdata[0]}</b><br><br>'
+                      f'{val_x}=%{{x}}<br>{val_y}=%{{y}}<br>'
+                      'team=%{customdata[1]}<extra></extra>',
+        showlegend=False,
+        marker=dict(color=color, colorscale=color_scale,
+                    cmin=0, cmax=color_max,
+                    size=styles['size'],
+                    line=dict(color=line_color, colorscale=line_scale,
+                              cmin=0, cmax=line_max,
+                              width=styles['line_width']),
+                    opacity=1),
+    ))
+
+    # Legend only entries for the highlighted teams
+    for team in teams:
+        fill, outline = team_colour(team)
+        fig.add_trace(go.Scattergl(
+            x=[None],
+            y=[None],
+            mode='markers',
+            name=team,
+            hoverinfo='skip',
+            marker=dict(color=fill, size=team_size,
+                        line=dict(color=outline, width=team_line_width)),
+        ))
+
+    fig.update_layout(
+        width=800, height=500,
+        xaxis_title=val_x,
+        yaxis_title=val_y,
+        legend_tracegroupgap=0,
+        margin=dict(
+            # l=20,
+            r=40,
+            t=60,
+            # b=20,
+        ),
+        paper_bgcolor=paper_bg_color,
+        plot_bgcolor=plot_bg_color,
+    )
+
+    return fig
+
+
+def base_figure(df, val_x, val_y, teams=(), player_colors=None,
+                trend=None, zone_lines_type=None):
+    """ scatter_figure() plus the credits and either a trend line, trend
+    being the x and y of the curve, or the zone lines at the 'Median' or
+    'Average' of each axis """
+    fig = scatter_figure(df, val_x, val_y, teams, player_colors)
+
+    if trend is not None:
+        trend_x, trend_y = trend
+
+        fig.add_trace(
+            go.Scatter(
+                x=trend_x,
+                y=trend_y,
+                showlegend=False,
+                mode='lines',
+                line_color=trend_color,
+            )
+        )
+
+    elif zone_lines_type is not None:
+
+        if zone_lines_type == 'Median':
+            hline_val = np.median(df[val_y])
+            vline_val = np.median(df[val_x])
+
+        elif zone_lines_type == 'Average':
+            hline_val = np.average(df[val_y])
+            vline_val = np.average(df[val_x])
+
+        # Add median line for y-axis
+        fig.add_hline(
+            y=hline_val,
+            line_dash="dot",
+            line_color=zone_line_color
+        )
+
+        # Add median line for x-axis
+        fig.add_vline(
+            x=vline_val,
+            line_dash="dot",
+            line_color=zone_line_color
+        )
+
+    # Add Credits
+    x = 1.01
+    y = 0
+    ydiff = 0.05
+    fig.add_annotation(x=x, y=y,
+                       xref="paper", yref="paper",
+                       text="Daniel Granja C.",
+                       font_color=credits_color,
+                       font_size=16,
+                       showarrow=False,
+                       yshift=10)
+
+    fig.add_annotation(x=x, y=y-ydiff,
+                       xref="paper", yref="paper",
+                       text="@DGCFutbol",
+                       font_color=credits_color,
+                       font_size=15,
+                       showarrow=False,
+                       yshift=10)
+
+    return fig
+
+
+def tag_annotation(x, y, tag, arrow_color):
+    """ Annotation of a highlighted player at (x, y). tag holds the sidebar
+    values: ax, ay, text, show, x_shift and y_shift """
+    return dict(
+        x=x,
+        y=y,
+        ax=tag['ax'],
+        ay=tag['ay'],
+        text=tag['text'],
+        arrowcolor=arrow_color,
+        arrowsize=0.3,
+        showarrow=tag['show'],
+        xshift=float(tag['x_shift']),
+        yshift=float(tag['y_shift']),
+    )
+
+
+def with_tags(spec, title, annotations):
+    """ Copy of a base figure spec (fig.to_plotly_json()) with the title and
+    tag annotations set. The traces are shared, not copied """
+    layout = dict(spec['layout'])
+    layout['title'] = dict(text=title, font=dict(size=25), automargin=True)
+    layout['annotations'] = list(layout.get('annotations', ())) + \
+        list(annotations)
+
+    return dict(spec, layout=layout)
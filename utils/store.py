@@ -0,0 +1,189 @@
+"""
+Columnar storage for the fbref season tables.
+
+The raw CSV exports (data/*_fbref_stats.csv) are parsed once, coerced to a
+declared schema and split into one Parquet file per league and season:
+
+    data/fbref/ENG-Premier League/2223.parquet
+
+The directory layout is the catalog: available (league, season) slices are
+listed from the file names, and a page only ever reads the slices it shows.
+Categorical columns come back dictionary encoded and numeric columns already
+downcast.
+
+Build from the command line with:
+    python -m utils.store
+"""
+import glob
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+SOURCES = 'data/*_fbref_stats.csv'
+STORE_ROOT = 'data/fbref'
+
+# --------------------------------------------------------------------- SCHEMA
+# Descriptive columns, in file order. Everything after these is a stat.
+ID_SCHEMA = {
+    'league': 'category',
+    'season': 'int16',
+    'team': 'category',
+    'player': 'string',
+    'player_id': 'int64',
+    'nation': 'category',
+    'pos': 'category',
+    'age': 'float32',
+    'born': 'float32',
+    'MP': 'int16',
+    'Starts': 'int16',
+    'Min': 'int16',
+    # Shown in tables; float32 would print 30.8 as 30.799999
+    '90s': 'float64',
+}
+
+# Stat columns: integers are downcast to the smallest type holding the
+# season's values, floats are stored as float32.
+STAT_FLOAT = 'float32'
+
+# Bump when the stored layout changes so existing stores get rebuilt
+SCHEMA_VERSION = '3'
+
+
+def player_ids(df):
+    """ Stable integer id per player, the same in every season and team.
+
+    Hashes name, nation and birth year, so namesakes get different ids and a
+    player who changes teams mid-season keeps the same one.
+    """
+    keys = df['player'].astype(str) + '|' + df['nation'].astype(str) \
+        + '|' + df['born'].astype('float64').astype(str)
+
+    def digest(key):
+        h = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(h, 'big') >> 1  # Fits in int64
+
+    return keys.map(digest)
+
+
+def apply_schema(df):
+    """ Coerce a raw fbref frame to the declared schema """
+    df = df.copy()
+
+    if 'player_id' not in df.columns:
+        df.insert(df.columns.get_loc('player') + 1,
+                  'player_id', player_ids(df))
+
+    for col, dtype in ID_SCHEMA.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+
+    for col in df.columns[len(ID_SCHEMA):]:
+        if pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype(STAT_FLOAT)
+
+    return df
+
+
+# ---------------------------------------------------------------------- BUILD
+def slice_path(league, season, root=STORE_ROOT):
+    return os.path.join(root, league, f'{season}.parquet')
+
+
+def build_store(sources=SOURCES, root=STORE_ROOT):
+    """ Parse every CSV export and write one Parquet file per slice """
+    paths = []
+    for csv_path in sorted(glob.glob(sources)):
+        df = pd.read_csv(csv_path)
+
+        for (league, season), part in df.groupby(['league', 'season']):
+            out = slice_path(league, season, root)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            part = apply_schema(part.reset_index(drop=True))
+
+            # Write to a temp file first so concurrent workers never read a
+            # partial file.
+            tmp = f'{out}.{os.getpid()}.tmp'
+            part.to_parquet(tmp, engine='pyarrow', index=False)
+            os.replace(tmp, out)
+            paths.append(out)
+
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, '_version'), 'w') as f:
+        f.write(SCHEMA_VERSION)
+
+    return paths
+
+
+def is_stale(sources=SOURCES, root=STORE_ROOT):
+    built = glob.glob(os.path.join(root, '*', '*.parquet'))
+    if not built:
+        return True
+
+    try:
+        with open(os.path.join(root, '_version')) as f:
+            if f.read() != SCHEMA_VERSION:
+                return True
+    except FileNotFoundError:
+        return True
+
+    csv_paths = glob.glob(sources)
+    if not csv_paths:
+        return False
+
+    newest_source = max(os.path.getmtime(p) for p in csv_paths)
+    return min(os.path.getmtime(p) for p in built) < newest_source
+
+
+def ensure_store(sources=SOURCES, root=STORE_ROOT):
+    if is_stale(sources, root):
+        build_store(sources, root)
+
+
+# -------------------------------------------------------------------- CATALOG
+def list_slices(root=STORE_ROOT):
+    """ Available (league, season) pairs, newest season first """
+    ensure_store(root=root)
+
+    slices = []
+    for path in glob.glob(os.path.join(root, '*', '*.parquet')):
+        league = os.path.basename(os.path.dirname(path))
+        season = int(os.path.splitext(os.path.basename(path))[0])
+        slices.append((league, season))
+
+    return sorted(slices, key=lambda s: (s[0], -s[1]))
+
+
+def league_name(league):
+    # fbref prefixes the country: 'ENG-Premier League'
+    return league.split('-', 1)[-1]
+
+
+def season_name(season):
+    # Seasons are stored as 2223 for 2022-2023
+    season = str(season)
+    return f'{season[:2]}/{season[2:]}'
+
+
+# ----------------------------------------------------------------------- READ
+def load_table(league, season, columns=None, root=STORE_ROOT):
+    """ Read a single league/season slice """
+    ensure_store(root=root)
+
+    return pd.read_parquet(slice_path(league, season, root),
+                           engine='pyarrow',
+                           columns=columns)
+
+
+def stat_columns(df):
+    """ Numeric stat columns, i.e. everything after the descriptive ones """
+    return df.iloc[:, len(ID_SCHEMA):].select_dtypes(
+        include=np.number).columns.tolist()
+
+
+if __name__ == '__main__':
+    for path in build_store():
+        print(path)